@@ -0,0 +1,95 @@
+#Vectorized version of the dex_quotes.py buy/sell math, for quoting thousands of (market, amount) pairs at once
+#Every argument can be a scalar or an array, and they are broadcast against each other. Each row is an
+#independent trade against the given reserves (rows do not affect each other). Only the traded market's reserves
+#are returned; the RSWP market moves made by the token_fees legs are not. Without token_fees the burn share of the
+#fee only goes to dex.burn_fees (see flush_burns), so the RSWP market does not move and nothing is missing.
+#
+#This uses float64, so results match dex_quotes.py (and the contract) to about 10 significant digits, not
+#bit-for-bit. Use dex_quotes.py when an exact amount is needed, e.g. for minimum_received.
+import numpy as np
+
+def constant_product(reserve_in, reserve_out, amount_in):
+    #Returns (amount out, new output reserve) before fees, like the k / new_reserve steps in the contract
+    new_reserve_out = reserve_in * reserve_out / (reserve_in + amount_in)
+    return reserve_out - new_reserve_out, new_reserve_out
+
+def internal_buy(currency_reserve, token_reserve, currency_amount, fee_percentage):
+    tokens_purchased, new_token_reserve = constant_product(currency_reserve, token_reserve, currency_amount)
+    return np.where(currency_amount > 0, tokens_purchased - tokens_purchased * fee_percentage, 0)
+
+def internal_sell(currency_reserve, token_reserve, token_amount, fee_percentage):
+    currency_purchased, new_currency_reserve = constant_product(token_reserve, currency_reserve, token_amount)
+    return np.where(token_amount > 0, currency_purchased - currency_purchased * fee_percentage, 0)
+
+def batch_quote(currency_reserves, token_reserves, amounts, state, rswp_reserves, is_buy=True, discounts=1,
+                token_fees=False, is_rswp=False):
+    #currency_reserves, token_reserves: reserves of the traded markets
+    #amounts: currency_amount for buys, token_amount for sells
+    #state: dict with FEE_PERCENTAGE, TOKEN_DISCOUNT and BURN_PERCENTAGE (like dex.state)
+    #rswp_reserves: (currency_reserve, token_reserve) of the TOKEN_CONTRACT market, used by the burn and token_fees legs
+    #is_rswp: True for rows that trade the TOKEN_CONTRACT market itself (no discount, no burn)
+    currency_reserves, token_reserves, amounts, is_buy, discounts, token_fees, is_rswp = np.broadcast_arrays(
+        np.asarray(currency_reserves, dtype=np.float64),
+        np.asarray(token_reserves, dtype=np.float64),
+        np.asarray(amounts, dtype=np.float64),
+        np.asarray(is_buy, dtype=bool),
+        np.asarray(discounts, dtype=np.float64),
+        np.asarray(token_fees, dtype=bool),
+        np.asarray(is_rswp, dtype=bool)
+    )
+
+    assert (amounts > 0).all(), 'Must provide currency amount and token amount!'
+
+    fee_percentage = float(state["FEE_PERCENTAGE"])
+    token_discount = float(state["TOKEN_DISCOUNT"])
+    burn_percentage = float(state["BURN_PERCENTAGE"])
+    rswp_currency_reserve, rswp_token_reserve = float(rswp_reserves[0]), float(rswp_reserves[1])
+
+    fee_percent = np.where(is_rswp, fee_percentage, fee_percentage * discounts) #Discount is applied here
+    uses_token_fees = token_fees & ~is_rswp
+
+    #Buys: currency in, tokens out, fee taken from the tokens
+    tokens_purchased, buy_token_reserve = constant_product(currency_reserves, token_reserves, amounts)
+    buy_fee = tokens_purchased * fee_percent
+    token_fee = buy_fee * token_discount
+
+    #token_fees: the fee is valued in TAU on this market, then converted to RSWP on the RSWP market
+    rswp_currency_purchased, _ = constant_product(token_reserves, currency_reserves, token_fee)
+    rswp_currency_purchased = rswp_currency_purchased + rswp_currency_purchased * fee_percent
+    buy_rswp_fee, _ = constant_product(rswp_currency_reserve, rswp_token_reserve, rswp_currency_purchased + rswp_currency_purchased * fee_percent)
+    buy_currency_received = internal_sell(rswp_currency_reserve, rswp_token_reserve, buy_rswp_fee * burn_percentage, fee_percentage)
+    buy_token_received = internal_buy(currency_reserves, token_reserves, buy_currency_received, fee_percentage)
+
+    buy_amount = np.where(uses_token_fees, tokens_purchased, tokens_purchased - buy_fee)
+    buy_token_reserve = buy_token_reserve + np.where(uses_token_fees, buy_token_received, np.where(is_rswp, buy_fee, buy_fee * burn_percentage))
+    buy_currency_reserve = currency_reserves + amounts
+
+    #Sells: tokens in, currency out, fee taken from the currency
+    currency_purchased, sell_currency_reserve = constant_product(token_reserves, currency_reserves, amounts)
+    sell_fee = currency_purchased * fee_percent
+    currency_fee = sell_fee * token_discount
+
+    sell_rswp_fee, _ = constant_product(rswp_currency_reserve, rswp_token_reserve, currency_fee + currency_fee * fee_percent)
+    sell_currency_received = internal_sell(rswp_currency_reserve, rswp_token_reserve, sell_rswp_fee * burn_percentage, fee_percentage)
+
+    sell_amount = np.where(uses_token_fees, currency_purchased, currency_purchased - sell_fee)
+    sell_currency_reserve = sell_currency_reserve + np.where(uses_token_fees, sell_currency_received, np.where(is_rswp, sell_fee, sell_fee * burn_percentage))
+    sell_token_reserve = token_reserves + amounts
+
+    new_currency_reserves = np.where(is_buy, buy_currency_reserve, sell_currency_reserve)
+    new_token_reserves = np.where(is_buy, buy_token_reserve, sell_token_reserve)
+
+    amount_out = np.where(is_buy, buy_amount, sell_amount)
+    assert (amount_out > 0).all(), 'Token reserve error!'
+
+    prices = currency_reserves / token_reserves
+    new_prices = new_currency_reserves / new_token_reserves
+
+    return {
+        "amount": amount_out, #Tokens (buy) or currency (sell) sent to the caller
+        "currency_reserve": new_currency_reserves,
+        "token_reserve": new_token_reserves,
+        "price": new_prices,
+        "price_impact": new_prices / prices - 1, #Relative change of the market price caused by the trade
+        "rswp_fee": np.where(uses_token_fees, np.where(is_buy, buy_rswp_fee, sell_rswp_fee), 0) #RSWP pulled from the caller
+    }
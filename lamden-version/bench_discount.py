@@ -0,0 +1,38 @@
+#Compares the table based natural_log used by stake against the LOG_ACCURACY formula it replaced
+#Run with `python3 bench_discount.py`. Uses dex_quotes.py, so Contracting is optional
+import timeit
+from decimal import localcontext
+from dex_quotes import decimal, CONTEXT, natural_log, calculate_discount
+
+LOG_ACCURACY = 1000000000
+STATE = {"MULTIPLIER": 0.05, "DISCOUNT_FLOOR": 0.0}
+AMOUNTS = [0.001, 0.5, 1, 2, 10, 100, 1000, 12345.678, 1000000, 1000000000]
+
+def old_log(value):
+    #LOG_ACCURACY * (value ** (1 / LOG_ACCURACY) - 1), the discount curve stake used before
+    return LOG_ACCURACY * (decimal(str(value)) ** (decimal(1) / LOG_ACCURACY) - 1)
+
+def old_discount(amount):
+    discount_amount = old_log(amount) * decimal(str(STATE["MULTIPLIER"])) - decimal(str(STATE["DISCOUNT_FLOOR"]))
+    return min(max(discount_amount, 0), decimal("0.99"))
+
+if __name__ == "__main__":
+    with localcontext(CONTEXT):
+        print("{:<16}{:>34}{:>34}{:>12}".format("amount", "old ln", "table ln", "difference"))
+        worst = 0
+        for amount in AMOUNTS:
+            old, new = old_log(amount), natural_log(amount)
+            worst = max(worst, abs(old - new))
+            print("{:<16}{:>34.24f}{:>34.24f}{:>12.2e}".format(amount, old, new, abs(old - new)))
+
+        #Most of the difference is the old formula's own error, about ln(x) ** 2 / (2 * LOG_ACCURACY). The table is within 1e-13 of ln
+        print("largest difference in ln: {:.2e}, in discount: {:.2e}".format(worst, worst * decimal(str(STATE["MULTIPLIER"]))))
+
+        for amount in AMOUNTS:
+            assert abs(old_discount(amount) - decimal(str(calculate_discount(amount, STATE)))) < decimal("1e-6"), amount
+
+        number = 2000
+        old_time = timeit.timeit(lambda: [old_discount(amount) for amount in AMOUNTS], number=number)
+        new_time = timeit.timeit(lambda: [calculate_discount(amount, STATE) for amount in AMOUNTS], number=number)
+        calls = number * len(AMOUNTS)
+        print("old formula: {:.2f} us per discount, table: {:.2f} us per discount".format(old_time / calls * 1e6, new_time / calls * 1e6))
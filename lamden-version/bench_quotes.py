@@ -0,0 +1,51 @@
+#Compares batch_quotes.py against looping over dex_quotes.py for the same (market, amount) pairs
+#Run with `python3 bench_quotes.py [rows]`
+import sys
+import timeit
+import numpy as np
+import dex_quotes
+import batch_quotes
+
+STATE = {"FEE_PERCENTAGE": 0.003, "TOKEN_CONTRACT": "con_amm", "TOKEN_DISCOUNT": 0.75, "BURN_PERCENTAGE": 0.8}
+RSWP_RESERVES = (100000.0, 250000.0)
+
+def make_orders(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    currency_reserves = rng.uniform(100, 1000000, rows)
+    token_reserves = rng.uniform(100, 10000000, rows)
+    is_buy = rng.integers(0, 2, rows).astype(bool)
+    #Trade up to 10% of the input side reserve
+    amounts = np.where(is_buy, currency_reserves, token_reserves) * rng.uniform(0.0001, 0.1, rows)
+    discounts = rng.uniform(0.5, 1, rows)
+    token_fees = rng.integers(0, 2, rows).astype(bool)
+
+    return currency_reserves, token_reserves, amounts, is_buy, discounts, token_fees
+
+def scalar_quotes(orders):
+    results = []
+    for currency_reserve, token_reserve, amount, is_buy, discount, token_fees in zip(*orders):
+        reserves = {"con_amm": list(RSWP_RESERVES), "con_token": [float(currency_reserve), float(token_reserve)]}
+        quote = dex_quotes.buy if is_buy else dex_quotes.sell
+        results.append(quote(reserves, STATE, "con_token", float(amount), discount=float(discount), token_fees=bool(token_fees))["amount"])
+
+    return results
+
+def batch(orders):
+    currency_reserves, token_reserves, amounts, is_buy, discounts, token_fees = orders
+    return batch_quotes.batch_quote(currency_reserves, token_reserves, amounts, STATE, RSWP_RESERVES, is_buy=is_buy,
+                                    discounts=discounts, token_fees=token_fees)["amount"]
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    orders = make_orders(rows)
+
+    scalar_time = min(timeit.repeat(lambda: scalar_quotes(orders), number=1, repeat=3))
+    batch_time = min(timeit.repeat(lambda: batch(orders), number=1, repeat=3))
+
+    expected = np.array([float(amount) for amount in scalar_quotes(orders)])
+    error = np.max(np.abs(batch(orders) - expected) / expected)
+
+    print("{} quotes".format(rows))
+    print("scalar (dex_quotes): {:.4f}s ({:.2f}us per quote)".format(scalar_time, scalar_time / rows * 1e6))
+    print("batch (batch_quotes): {:.4f}s ({:.2f}us per quote)".format(batch_time, batch_time / rows * 1e6))
+    print("speedup: {:.1f}x, max relative difference: {:.2e}".format(scalar_time / batch_time, error))
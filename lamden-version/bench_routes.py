@@ -0,0 +1,51 @@
+#Times route_finder.py searches and reserve updates on a generated graph of dex and dex_pairs markets
+#Run with `python3 bench_routes.py [markets]`
+import sys
+import random
+import timeit
+import route_finder
+
+STATE = {"FEE_PERCENTAGE": 0.003, "TOKEN_CONTRACT": "con_amm", "TOKEN_DISCOUNT": 0.75, "BURN_PERCENTAGE": 0.8}
+
+def make_finder(markets, seed=0):
+    rng = random.Random(seed)
+    tokens = ["con_token{}".format(i) for i in range(markets)]
+
+    #Every token has a dex market, half of them also have a dex_pairs market against TAU and a few against RSWP
+    reserves = {"con_amm": [100000.0, 250000.0]}
+    pairs = {}
+    for token in tokens:
+        reserves[token] = [rng.uniform(100, 1000000), rng.uniform(100, 10000000)]
+        if rng.random() < 0.5:
+            pairs["currency", token] = (rng.uniform(100, 1000000), rng.uniform(100, 10000000))
+        if rng.random() < 0.1:
+            pairs["con_amm", token] = (rng.uniform(100, 250000), rng.uniform(100, 10000000))
+
+    finder = route_finder.RouteFinder()
+    finder.load_dex(reserves, STATE)
+    finder.load_pairs(pairs)
+
+    return finder, tokens, reserves, rng
+
+if __name__ == "__main__":
+    markets = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    finder, tokens, reserves, rng = make_finder(markets)
+    searches = [(rng.choice(tokens), rng.choice(tokens), rng.uniform(1, 10000)) for i in range(1000)]
+    searches = [search for search in searches if search[0] != search[1]]
+
+    def search_all():
+        for token_in, token_out, amount in searches:
+            finder.find_route(token_in, token_out, amount)
+
+    def update_all():
+        for token in tokens:
+            finder.update_dex_market(token, reserves[token][0] * 1.001, reserves[token][1] * 0.999)
+
+    cold_time = timeit.timeit(search_all, number=1)
+    warm_time = min(timeit.repeat(search_all, number=1, repeat=3))
+    update_time = min(timeit.repeat(update_all, number=1, repeat=3))
+
+    print("{} tokens, {} markets".format(len(tokens), len(finder.pools)))
+    print("find_route (first search of a pair): {:.1f}us".format(cold_time / len(searches) * 1e6))
+    print("find_route (cached paths): {:.1f}us".format(warm_time / len(searches) * 1e6))
+    print("update_dex_market: {:.2f}us".format(update_time / len(tokens) * 1e6))
@@ -0,0 +1,72 @@
+#Compares the stamps used by dex calls against the contract at another git revision
+#Run with `python3 bench_stamps.py <revision>`, e.g. the commit before a change. Requires Contracting and MongoDB, like the tests
+import sys
+import os
+import subprocess
+import tempfile
+import importlib.util
+from contracting.client import ContractingClient
+import dex_contract
+
+CALLS = [
+    ("buy", {"contract": "con_token1", "currency_amount": 10.0}),
+    ("buy", {"contract": "con_token1", "currency_amount": 10.0, "token_fees": True}),
+    ("sell", {"contract": "con_token1", "token_amount": 10.0}),
+    ("sell", {"contract": "con_token1", "token_amount": 10.0, "token_fees": True}),
+    ("buy", {"contract": "con_amm", "currency_amount": 10.0}),
+    ("sell", {"contract": "con_amm", "token_amount": 10.0})
+]
+
+def load_dex(revision):
+    #closure_to_code_string needs the source file, so the old contract is imported from a temporary file
+    code = subprocess.check_output(["git", "show", "{}:./dex_contract.py".format(revision)])
+    path = os.path.join(tempfile.mkdtemp(), "dex_contract_{}.py".format(revision.replace("~", "_").replace("^", "_")))
+    with open(path, "wb") as f:
+        f.write(code)
+
+    spec = importlib.util.spec_from_file_location("dex_contract_old", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module.dex
+
+def measure(dex):
+    client = ContractingClient()
+    client.flush()
+
+    with open('currency.c.py') as f:
+        contract = f.read()
+        client.submit(contract, 'currency')
+        client.submit(contract, 'con_token1')
+        client.submit(contract, 'con_amm')
+
+    client.submit(dex, 'dex')
+
+    for name in ('currency', 'con_token1', 'con_amm'):
+        client.get_contract(name).approve(amount=100000, to='dex')
+
+    client.get_contract('dex').create_market(contract='con_amm', currency_amount=1000, token_amount=1000)
+    client.get_contract('dex').create_market(contract='con_token1', currency_amount=1000, token_amount=10000)
+
+    stamps = []
+    for function_name, kwargs in CALLS:
+        output = client.executor.execute(sender='sys', contract_name='dex', function_name=function_name,
+                                         kwargs=dict(kwargs), metering=True, auto_commit=True)
+        assert output['status_code'] == 0, output['result']
+        stamps.append(output['stamps_used'])
+
+    client.flush()
+    return stamps
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("Usage: python3 bench_stamps.py <revision>")
+    revision = sys.argv[1]
+
+    old = measure(load_dex(revision))
+    new = measure(dex_contract.dex)
+
+    print("{:<40}{:>12}{:>12}".format("call", revision, "current"))
+    for (function_name, kwargs), old_stamps, new_stamps in zip(CALLS, old, new):
+        label = "{}({}, token_fees={})".format(function_name, kwargs["contract"], kwargs.get("token_fees", False))
+        print("{:<40}{:>12}{:>12}".format(label, old_stamps, new_stamps))
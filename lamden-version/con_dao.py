@@ -3,7 +3,8 @@
 #Basic tests have been completed, and this SC should be fully functional. However, no edge case tests have been completed, so DEPLOY AT YOUR OWN RISK
 #This code has not been audited. Please take your own look at the code, and check it for bugs
 sig = Hash(default_value=False)
-proposal_details = Hash()
+proposal_details = Hash() #One record per proposal, a dict of its type, its fields, proposal_creator, description, time and duration
+proposal_index = Hash() #proposal_index[status, n] lists "active" and "resolved" proposals, proposal_index[status, "count"] is their number
 total_supply = Variable()
 proposal_id = Variable()
 minimum_proposal_duration = Variable()
@@ -17,12 +18,20 @@ sign_transaction_contract = Variable()
 status = Hash()
 balances = Hash(default_value=0)
 misc = Hash()
+tallies = Hash(default_value=[0, 0]) #[approvals, total_votes] of each proposal, updated by every vote
+votes_cast = Hash() #[result, weight] each voter's vote is currently counted with
+checkpoints = Hash() #checkpoints[account, n] = [time, voting power] in time order, checkpoints[account, "count"] is the number of checkpoints
+delegates = Hash() #Account that votes with a holder's balance. Holders without one vote with their own balance
+power = Hash(default_value=0) #Running voting power: own balance unless delegated, plus the balances delegated to the account
 @construct
 def seed():
     supply = 10000000 #Set total supply
     balances["wallet1"] = supply #Change this to change initial distribution
+    add_power("wallet1", supply)
     total_supply.set(supply) 
     proposal_id.set(0)
+    proposal_index["active", "count"] = 0
+    proposal_index["resolved", "count"] = 0
     minimum_proposal_duration.set(0) #Number is in days
     required_approval_percentage.set(0.5) #Keep this at 50%, unless there are special circumstances
     minimum_quorum.set(0.01) #Set minimum amount of votes needed
@@ -30,145 +39,121 @@ def seed():
     token_symbol.set("RKT") #Set token symbol
 @export
 def create_transfer_proposal(token_contract: str, amount: float, to: str, description: str, voting_time_in_days: int): #Transfer tokens held by the AMM treasury here
-    assert voting_time_in_days >= minimum_proposal_duration.get()
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "token_contract"] = token_contract
-    proposal_details[p_id, "amount"] = amount
-    proposal_details[p_id, "reciever"] = to
-    proposal_details[p_id, "type"] = "transfer"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "transfer",
+        "token_contract": token_contract,
+        "amount": amount,
+        "reciever": to
+    }, description, voting_time_in_days)
 @export
 def create_approval_proposal(token_contract: str, amount: float, to: str, description: str, voting_time_in_days: int): #Approve the transfer of tokens held by the AMM treasury here
-    assert voting_time_in_days >= minimum_proposal_duration.get()
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "token_contract"] = token_contract
-    proposal_details[p_id, "amount"] = amount
-    proposal_details[p_id, "reciever"] = to
-    proposal_details[p_id, "type"] = "approval"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "approval",
+        "token_contract": token_contract,
+        "amount": amount,
+        "reciever": to
+    }, description, voting_time_in_days)
 @export
-def vote(p_id: int, result: bool): #Vote here
+def vote(p_id: int, result: bool): #Vote here. Voting again replaces your previous vote
+    assert p_id < proposal_id.get(), "Proposal does not exist!"
+    proposal = proposal_details[p_id]
+    assert voting_end(proposal) > now, "Proposal is over!"
     sig[p_id, ctx.caller] = result
-    try:
-        proposal_details[p_id, "voters"].append(ctx.caller)
-    except AttributeError:
-        proposal_details[p_id, "voters"] = [ctx.caller]
+    weight = power_at(ctx.caller, proposal["time"]) #Only power held before the block the proposal started in counts
+    approvals, total_votes = tallies[p_id]
+    previous = votes_cast[p_id, ctx.caller]
+    if previous is not None: #Take the previous vote out of the tallies
+        if previous[0] == True:
+            approvals -= previous[1]
+        total_votes -= previous[1]
+    if result == True:
+        approvals += weight
+    total_votes += weight
+    tallies[p_id] = [approvals, total_votes]
+    votes_cast[p_id, ctx.caller] = [result, weight]
 @export
 def determine_results(p_id: int): #Vote resolution takes place here
-    assert (proposal_details[p_id, "time"] + datetime.timedelta(days=1) * (proposal_details[p_id, "duration"])) <= now, "Proposal not over!" #Checks if proposal has concluded
-    assert finished_proposals[p_id] is not True, "Proposal already resolved" #Checks that the proposal has not been resolved before (to prevent double spends)
     assert p_id < proposal_id.get()
+    proposal = proposal_details[p_id]
+    assert voting_end(proposal) <= now, "Proposal not over!" #Checks if proposal has concluded
+    assert finished_proposals[p_id] is not True, "Proposal already resolved" #Checks that the proposal has not been resolved before (to prevent double spends)
     finished_proposals[p_id] = True #Adds the proposal to the list of resolved proposals
-    approvals = 0
-    total_votes = 0
-    for x in proposal_details[p_id, "voters"]:
-        if sig[p_id, x] == True:
-            approvals += balances[x]
-        total_votes += balances[x]
+    move_to_resolved(p_id)
+    approvals, total_votes = tallies[p_id] #Votes are weighted by the voting power the voter had just before the proposal started
     quorum = total_supply.get() - balances[ctx.this] 
     if approvals < (quorum * minimum_quorum.get()): #Checks that the minimum approval percentage has been reached (quorum)
         return False
     if approvals / total_votes >= required_approval_percentage.get(): #Checks that the approval percentage of the votes has been reached (% of total votes)
-        if proposal_details[p_id, "type"] == "transfer": 
-            t_c = importlib.import_module(proposal_details[p_id, "token_contract"])
-            t_c.transfer(proposal_details[p_id, "amount"], proposal_details[p_id, "reciever"])
-        elif proposal_details[p_id, "type"] == "approval":
-            t_c = importlib.import_module(proposal_details[p_id, "token_contract"])
-            t_c.approve(proposal_details[p_id, "amount"], proposal_details[p_id, "reciever"])
-        elif proposal_details[p_id, "type"] == "change_approval_percentage":
-            required_approval_percentage.set(proposal_details[p_id, "amount"])
-        elif proposal_details[p_id, "type"] == "change_minimum_duration":
-            minimum_proposal_duration.set(proposal_details[p_id, "amount"])
-        elif proposal_details[p_id, "type"] == "change_active_contract":
-            active_contract.set(proposal_details[p_id, "contract"])
-        elif proposal_details[p_id, "type"] == "sign_custom_transaction":
-            contract = importlib.import_module(proposal_details[p_id, "contract"])
-            contract.run(proposal_details[p_id, "function"], proposal_details[p_id, "kwargs"])
-        elif proposal_details[p_id, "type"] == "mint":
-            balances[proposal_details[p_id, "reciever"]] += proposal_details[p_id, "amount"]
-            total_supply.set(total_supply.get() + proposal_details[p_id, "amount"])
-        elif proposal_details[p_id, "type"] == "set_state":
-            misc[proposal_details[p_id, "key"]] = proposal_details[p_id, "state"]
+        if proposal["type"] == "batch": #Actions run in order, and any failing action reverts the whole resolution
+            for action in proposal["actions"]:
+                execute_action(action)
+        else:
+            execute_action(proposal)
         status[p_id] = True
         return True
     else:
         status[p_id] = False
         return False
 @export
+def create_batch_proposal(actions: list, description: str, voting_time_in_days: int): #Several actions under one vote. Each action is a dict like a single proposal, e.g. {"type": "transfer", "token_contract": ..., "amount": ..., "reciever": ...}
+    assert len(actions) > 0 and len(actions) <= 20, "Must provide between 1 and 20 actions!"
+    checked = []
+    for action in actions:
+        checked.append(check_action(action))
+    return create_proposal({
+        "type": "batch",
+        "actions": checked
+    }, description, voting_time_in_days)
+@export
 def change_approval_percentage(new_percentage: float, description: str, voting_time_in_days: int): 
-    assert voting_time_in_days >= minimum_proposal_duration.get()
     assert new_percentage <= 1
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "amount"] = new_percentage
-    proposal_details[p_id, "type"] = "change_approval_percentage"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "change_approval_percentage",
+        "amount": new_percentage
+    }, description, voting_time_in_days)
 @export
 def create_signalling_vote(action: str, description: str, voting_time_in_days: int):
-    assert voting_time_in_days >= minimum_proposal_duration.get()
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "action"] = action
-    proposal_details[p_id, "type"] = "create_signalling_vote"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "create_signalling_vote",
+        "action": action
+    }, description, voting_time_in_days)
 @export
 def change_minimum_duration(new_minimum_amount: int, description: str, voting_time_in_days: int):
-    assert voting_time_in_days >= minimum_proposal_duration.get()
     assert new_minimum_amount <= 365
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "amount"] = new_minimum_amount
-    proposal_details[p_id, "type"] = "change_minimum_duration"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "change_minimum_duration",
+        "amount": new_minimum_amount
+    }, description, voting_time_in_days)
 @export
 def change_active_contract(new_contract: str, description: str, voting_time_in_days: int):
-    assert voting_time_in_days >= minimum_proposal_duration.get()
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "contract"] = new_contract
-    proposal_details[p_id, "type"] = "change_active_contract"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "change_active_contract",
+        "contract": new_contract
+    }, description, voting_time_in_days)
 @export
 def sign_custom_transaction(contract: str, function: str, kwargs: dict, description: str, voting_time_in_days: int): #For future extensibility. It is highly recommended that any contract put in the contract field has its owner set to the governance contract 
-    assert voting_time_in_days >= minimum_proposal_duration.get()
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "contract"] = contract
-    proposal_details[p_id, "function"] = function
-    proposal_details[p_id, "kwargs"] = kwargs
-    proposal_details[p_id, "type"] = "sign_custom_transaction"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "sign_custom_transaction",
+        "contract": contract,
+        "function": function,
+        "kwargs": kwargs
+    }, description, voting_time_in_days)
 @export
 def create_mint_proposal(amount: float, to: str, description: str, voting_time_in_days: int): #Mint tokens. Warning: Dangerous, and can lead to the takeover of the SC
-    assert voting_time_in_days >= minimum_proposal_duration.get()
     assert voting_time_in_days >= 0, "Minting has a set minimum length of 7 days" #Set hardcoded minimum duration here
     assert amount > 0
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "amount"] = amount
-    proposal_details[p_id, "reciever"] = to
-    proposal_details[p_id, "type"] = "mint"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "mint",
+        "amount": amount,
+        "reciever": to
+    }, description, voting_time_in_days)
 @export
 def set_state(new_state: str, key: list, description: str, voting_time_in_days: int): #Set state here. For future extensibility
-    assert voting_time_in_days >= minimum_proposal_duration.get()
-    p_id = proposal_id.get()
-    proposal_id.set(p_id + 1)
-    proposal_details[p_id, "state"] = new_state
-    proposal_details[p_id, "key"] = key
-    proposal_details[p_id, "type"] = "set_state"
-    modify_proposal(p_id, description, voting_time_in_days)
-    return p_id
+    return create_proposal({
+        "type": "set_state",
+        "state": new_state,
+        "key": key
+    }, description, voting_time_in_days)
 @export 
 def get_state(key: list): #Read state set by the set_state function. For future extensibility
     return misc[key]
@@ -181,23 +166,30 @@ def proposal_result(): #Get proposal result bool here
         return finished_proposals[p_id]
     return ""
 @export 
-def proposal_information(p_id: int): #Get proposal information, provided as a dictionary
-    info =	{
-        "action": proposal_details[p_id, "action"],
-        "state": proposal_details[p_id, "state"],
-        "key": proposal_details[p_id, "key"],
-        "token_contract": proposal_details[p_id, "token_contract"],
-        "contract": proposal_details[p_id, "contract"],
-        "function": proposal_details[p_id, "function"],
-        "kwargs": proposal_details[p_id, "kwargs"],
-        "proposal_creator": proposal_details[p_id, "proposal_creator"],
-        "description": proposal_details[p_id, "description"],
-        "time": proposal_details[p_id, "time"],
-        "type": proposal_details[p_id, "type"],
-        "duration": proposal_details[p_id, "duration"],
-        "reciever": proposal_details[p_id, "reciever"]
-    }
+def proposal_information(p_id: int): #Get proposal information, provided as a dictionary. Fields the proposal does not have are None
+    info = dict(proposal_details[p_id] or {})
+    for field in ["action", "state", "key", "token_contract", "amount", "contract", "function", "kwargs", "proposal_creator", "description", "time", "type", "duration", "reciever"]:
+        if field not in info:
+            info[field] = None
     return info
+@export
+def list_proposals(proposal_status: str, start: int, limit: int): #proposal_status is "active", "resolved" or "all". Active proposals are not kept in creation order
+    assert limit > 0 and limit <= 50, "Limit must be between 1 and 50!"
+    assert start >= 0, "Start must not be negative!"
+    if proposal_status == "all":
+        count = proposal_id.get()
+    else:
+        assert proposal_status == "active" or proposal_status == "resolved", "Invalid status!"
+        count = proposal_index[proposal_status, "count"]
+    result = []
+    for n in range(start, min(start + limit, count)):
+        p_id = n
+        if proposal_status != "all":
+            p_id = proposal_index[proposal_status, n]
+        proposal = dict(proposal_details[p_id])
+        proposal["p_id"] = p_id
+        result.append(proposal)
+    return result
 @export 
 def transfer(amount: float, to: str): #Basic token functionality starts here. This code is reasonably trustable
     assert amount > 0, 'Cannot send negative balances!'
@@ -205,10 +197,21 @@ def transfer(amount: float, to: str): #Basic token functionality starts here. Th
     assert balances[sender] >= amount, 'Not enough coins to send!'
     balances[sender] -= amount
     balances[to] += amount
+    add_power(sender, -amount)
+    add_power(to, amount)
 @export
 def balance_of(account: str):
     return balances[account]
 @export
+def voting_power(account: str, p_id: int): #Voting power of account just before the proposal started, which its vote is weighted by
+    assert p_id < proposal_id.get(), "Proposal does not exist!"
+    return power_at(account, proposal_details[p_id]["time"])
+@export
+def delegate(to: str): #Lets to vote with your balance. Delegate to yourself to vote with it again. Delegated power is not passed on by to
+    add_power(ctx.caller, -balances[ctx.caller])
+    delegates[ctx.caller] = to
+    add_power(ctx.caller, balances[ctx.caller])
+@export
 def allowance(owner: str, spender: str):
     return balances[owner, spender]
 @export
@@ -227,6 +230,8 @@ def transfer_from(amount: float, to: str, main_account: str):
     balances[main_account, sender] -= amount
     balances[main_account] -= amount
     balances[to] += amount
+    add_power(main_account, -amount)
+    add_power(to, amount)
 @export 
 def get_supply():
     return total_supply
@@ -236,8 +241,112 @@ def token_name():
 @export
 def token_symbol():
     return token_symbol.get()
-def modify_proposal(p_id: int, description: str, voting_time_in_days: int):
-    proposal_details[p_id, "proposal_creator"] = ctx.caller
-    proposal_details[p_id, "description"] = description
-    proposal_details[p_id, "time"] = now
-    proposal_details[p_id, "duration"] = voting_time_in_days
+def execute_action(action: dict):
+    if action["type"] == "transfer":
+        t_c = importlib.import_module(action["token_contract"])
+        t_c.transfer(action["amount"], action["reciever"])
+    elif action["type"] == "approval":
+        t_c = importlib.import_module(action["token_contract"])
+        t_c.approve(action["amount"], action["reciever"])
+    elif action["type"] == "change_approval_percentage":
+        required_approval_percentage.set(action["amount"])
+    elif action["type"] == "change_minimum_duration":
+        minimum_proposal_duration.set(action["amount"])
+    elif action["type"] == "change_active_contract":
+        active_contract.set(action["contract"])
+    elif action["type"] == "sign_custom_transaction":
+        contract = importlib.import_module(action["contract"])
+        contract.run(action["function"], action["kwargs"])
+    elif action["type"] == "mint":
+        balances[action["reciever"]] += action["amount"]
+        add_power(action["reciever"], action["amount"])
+        total_supply.set(total_supply.get() + action["amount"])
+    elif action["type"] == "set_state":
+        misc[action["key"]] = action["state"]
+def check_action(action: dict): #Applies the checks of the single proposal functions, and converts amounts to decimals
+    action = dict(action)
+    fields = { #The fields execute_action reads for each action type, and their types
+        "transfer": [["token_contract", "str"], ["amount", "number"], ["reciever", "str"]],
+        "approval": [["token_contract", "str"], ["amount", "number"], ["reciever", "str"]],
+        "change_approval_percentage": [["amount", "number"]],
+        "change_minimum_duration": [["amount", "number"]],
+        "change_active_contract": [["contract", "str"]],
+        "sign_custom_transaction": [["contract", "str"], ["function", "str"], ["kwargs", "dict"]],
+        "mint": [["amount", "number"], ["reciever", "str"]],
+        "set_state": [["key", "list"], ["state", "str"]]
+    }
+    assert action.get("type") in fields, "Invalid action type!"
+    if "amount" in action:
+        action["amount"] = to_decimal(action["amount"])
+    for field, field_type in fields[action["type"]]:
+        assert field in action, "Action is missing " + field + "!"
+        if field_type == "number":
+            assert isinstance(action[field], int) or isinstance(action[field], decimal), field + " must be a number!"
+        elif field_type == "str":
+            assert isinstance(action[field], str), field + " must be a string!"
+        elif field_type == "dict":
+            assert isinstance(action[field], dict), field + " must be a dict!"
+        else:
+            assert isinstance(action[field], list), field + " must be a list!"
+    if action["type"] == "change_approval_percentage":
+        assert action["amount"] <= 1
+    elif action["type"] == "change_minimum_duration":
+        assert action["amount"] <= 365
+    elif action["type"] == "mint":
+        assert action["amount"] > 0
+    return action
+def to_decimal(value: float): #The executor only converts floats passed directly as arguments, not floats inside lists and dicts
+    if isinstance(value, float):
+        return decimal(str(value))
+    return value
+def create_proposal(proposal: dict, description: str, voting_time_in_days: int): #Stores the proposal as one record and adds it to the active proposals
+    assert voting_time_in_days >= minimum_proposal_duration.get()
+    p_id = proposal_id.get()
+    proposal_id.set(p_id + 1)
+    proposal["proposal_creator"] = ctx.caller
+    proposal["description"] = description
+    proposal["time"] = now
+    proposal["duration"] = voting_time_in_days
+    proposal_details[p_id] = proposal
+    count = proposal_index["active", "count"]
+    proposal_index["active", count] = p_id
+    proposal_index["active", "count"] = count + 1
+    proposal_index["position", p_id] = count
+    return p_id
+def voting_end(proposal: dict):
+    return proposal["time"] + datetime.timedelta(days=1) * (proposal["duration"])
+def move_to_resolved(p_id: int): #The last active proposal takes the place of the resolved one
+    count = proposal_index["active", "count"] - 1
+    position = proposal_index["position", p_id]
+    last = proposal_index["active", count]
+    proposal_index["active", position] = last
+    proposal_index["position", last] = position
+    proposal_index["active", count] = None
+    proposal_index["position", p_id] = None
+    proposal_index["active", "count"] = count
+    resolved = proposal_index["resolved", "count"]
+    proposal_index["resolved", resolved] = p_id
+    proposal_index["resolved", "count"] = resolved + 1
+def add_power(holder: str, amount: float): #Adds a change in the balance of holder to the voting power of whoever votes with it
+    account = delegates[holder] or holder
+    power[account] += amount
+    write_checkpoint(account)
+def write_checkpoint(account: str): #Records the current voting power of account. Several changes at the same time share one checkpoint
+    count = checkpoints[account, "count"] or 0
+    if count > 0 and checkpoints[account, count - 1][0] == now:
+        checkpoints[account, count - 1] = [now, power[account]]
+    else:
+        checkpoints[account, count] = [now, power[account]]
+        checkpoints[account, "count"] = count + 1
+def power_at(account: str, time): #Binary search for the last checkpoint strictly before time. Checkpoints at time can still change in that block, so they are left out
+    low = 0
+    high = checkpoints[account, "count"] or 0
+    while low < high: #Checkpoints before low are before time, checkpoints from high on are at or after it
+        middle = int((low + high) / 2)
+        if checkpoints[account, middle][0] < time:
+            low = middle + 1
+        else:
+            high = middle
+    if low == 0:
+        return 0
+    return checkpoints[account, low - 1][1]
@@ -13,16 +13,36 @@ def dex():
         I.Func('transfer_from', args=('amount', 'to', 'main_account'))
     ]
 
+    # Version 2 layout: one record per market of [currency_reserve, token_reserve, total_lp_points]. Prices are derived on read
+    markets = Hash()
+    market_count = Variable()
+    market_index = Hash() #Position in creation order -> contract, for list_markets
+
+    # Version 1 layout, only read by migrate_market
     pairs = Hash()
     prices = Hash(default_value=0)
+    reserves = Hash(default_value=[0, 0])
 
     lp_points = Hash(default_value=0)
-    reserves = Hash(default_value=[0, 0])
+    lp_positions = Hash(default_value=[]) #Markets each account holds LP points in
+    lp_allowances = Hash(default_value=0) #[contract, main_account, spender]. lp_points only holds balances
+    verified = Hash(default_value=False) #Result of the token interface check, done once in create_market
+    burn_fees = Hash(default_value=[0, 0]) #Currency and tokens of each market's fees that are waiting to be burned
     
     staked_amount = Hash(default_value=0)
+    staked_totals = Hash(default_value=0) #Sum of staked_amount for each token contract, which syncing leaves out of the reserves
     discount = Hash(default_value=1)
+    discount_epochs = Hash(default_value=0) #DISCOUNT_EPOCH each discount was calculated in
 
     state = Hash()
+    settings = Variable() #Packed copy of state, so a call reads its configuration once
+
+    # Keys of state that change_state can set
+    state_keys = ["FEE_PERCENTAGE", "TOKEN_CONTRACT", "TOKEN_DISCOUNT", "BURN_PERCENTAGE", "BURN_ADDRESS", "MULTIPLIER",
+                  "DISCOUNT_FLOOR", "BURN_THRESHOLD", "SYNC_ENABLED", "OWNER"]
+
+    # Keys of state that change every discount. Setting one starts a new DISCOUNT_EPOCH
+    discount_keys = ["TOKEN_CONTRACT", "MULTIPLIER", "DISCOUNT_FLOOR"]
     
     @construct
     def seed(): #These are supposed to be constants, but they are changable
@@ -31,88 +51,178 @@ def dex():
         state["TOKEN_DISCOUNT"] = 0.75
         state["BURN_PERCENTAGE"] = 0.8
         state["BURN_ADDRESS"] = "0x0" #Change this
-        state["LOG_ACCURACY"] = 1000000000.0 #The stamp difference for a higher number should be unnoticable
         state["MULTIPLIER"] = 0.05
         state["DISCOUNT_FLOOR"] = 0.0
+        state["BURN_THRESHOLD"] = 1 #Minimum TAU value flush_burns converts to RSWP
+        state["SYNC_ENABLED"] = False
         
         state["OWNER"] = ctx.caller 
+
+        state["DISCOUNT_EPOCH"] = 0 #Not in state_keys, only change_state sets it
+
+        market_count.set(0)
+
+        packed = {"DISCOUNT_EPOCH": 0}
+        for key in state_keys:
+            packed[key] = state[key]
+        settings.set(packed)
     
     @export
     def create_market(contract: str, currency_amount: float=0, token_amount: float=0):
-        assert pairs[contract] is None, 'Market already exists!'
+        assert markets[contract] is None and pairs[contract] is None, 'Market already exists!'
         assert currency_amount > 0 and token_amount > 0, 'Must provide currency amount and token amount!'
 
         token = I.import_module(contract)
 
         assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+        verified[contract] = True
 
         currency.transfer_from(amount=currency_amount, to=ctx.this, main_account=ctx.caller)
         token.transfer_from(amount=token_amount, to=ctx.this, main_account=ctx.caller)
 
-        prices[contract] = currency_amount / token_amount
-
-        pairs[contract] = True
-
         # Mint 100 liquidity points
         lp_points[contract, ctx.caller] = 100
-        lp_points[contract] = 100
+        update_position(contract, ctx.caller)
 
-        reserves[contract] = [currency_amount, token_amount]
+        markets[contract] = [currency_amount, token_amount, 100]
+        register_market(contract)
         
         return True
 
+    # Price of the token in TAU, derived from the reserves
+    @export
+    def get_price(contract: str):
+        market = markets[contract]
+        assert market is not None, 'Market does not exist!'
+
+        return price_of(market)
+
+    # Moves a market created with the version 1 layout (pairs, prices, reserves and lp_points[contract]) to markets. Anyone can call this
+    @export
+    def migrate_market(contract: str):
+        assert markets[contract] is None, 'Market is already migrated!'
+        assert pairs[contract] is True, 'Market does not exist!'
+
+        currency_reserve, token_reserve = reserves[contract]
+        market = [currency_reserve, token_reserve, lp_points[contract]]
+        markets[contract] = market
+        register_market(contract)
+
+        reserves[contract] = None
+        prices[contract] = None
+        lp_points[contract] = None
+
+        verified[contract] = I.enforce_interface(I.import_module(contract), token_interface)
+
+        return market
+
+    # Read-only, returns up to limit markets in creation order, starting at position start
+    @export
+    def list_markets(start: int=0, limit: int=50):
+        assert start >= 0, 'Start must not be negative!'
+        assert limit > 0 and limit <= 100, 'Limit must be between 1 and 100!'
+
+        end = min(start + limit, market_count.get())
+        result = []
+
+        for index in range(start, end):
+            contract = market_index[index]
+            market = markets[contract]
+            result.append({"contract": contract, "currency_reserve": market[0], "token_reserve": market[1]})
+
+        return result
+
+    # Read-only, the reserves, price, total LP points and account's LP points of each market in one call
+    @export
+    def get_markets_state(contracts: list, account: str=None):
+        if account == None:
+            account = ctx.caller
+
+        result = []
+        for contract in contracts:
+            market = markets[contract]
+            assert market is not None, 'Market does not exist!'
+
+            result.append({
+                "contract": contract,
+                "currency_reserve": market[0],
+                "token_reserve": market[1],
+                "price": price_of(market),
+                "total_lp_points": market[2],
+                "lp_points": lp_points[contract, account]
+            })
+
+        return result
+
     @export
     def liquidity_balance_of(contract: str, account: str):
         return lp_points[contract, account]
 
+    # Read-only, every market the account holds LP points in, with its LP points
+    @export
+    def liquidity_positions_of(account: str):
+        result = []
+        for contract in lp_positions[account]:
+            result.append({"contract": contract, "lp_points": lp_points[contract, account]})
+
+        return result
+
+    # Adds or removes a market from lp_positions[account]. Only needed for LP points held before migrate_market, anyone can call this
+    @export
+    def index_position(contract: str, account: str):
+        update_position(contract, account)
+
+        return lp_positions[account]
+
     @export
     def add_liquidity(contract: str, currency_amount: float=0):
-        assert pairs[contract] is True, 'Market does not exist!'
+        market = markets[contract]
+        assert market is not None, 'Market does not exist!'
 
         assert currency_amount > 0
 
+        assert verified[contract] is True, 'Invalid token interface!'
+
         token = I.import_module(contract)
 
-        assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+        currency_reserve, token_reserve, total_lp_points = market
 
         # Determine the number of tokens required
-        token_amount = currency_amount / prices[contract]
+        token_amount = currency_amount / price_of(market)
 
         # Transfer both tokens
         currency.transfer_from(amount=currency_amount, to=ctx.this, main_account=ctx.caller)
         token.transfer_from(amount=token_amount, to=ctx.this, main_account=ctx.caller)
 
         # Calculate the LP points to mint
-        total_lp_points = lp_points[contract]
-        currency_reserve, token_reserve = reserves[contract]
-
         points_per_currency = total_lp_points / currency_reserve
         lp_to_mint = points_per_currency * currency_amount
 
         # Update the LP points
         lp_points[contract, ctx.caller] += lp_to_mint
-        lp_points[contract] += lp_to_mint
+        update_position(contract, ctx.caller)
 
         # Update the reserves
-        reserves[contract] = [currency_reserve + currency_amount, token_reserve + token_amount]
+        markets[contract] = [currency_reserve + currency_amount, token_reserve + token_amount, total_lp_points + lp_to_mint]
         
         #Return amount of LP minted
         return lp_to_mint
 
     @export
     def remove_liquidity(contract: str, amount: float=0):
-        assert pairs[contract] is True, 'Market does not exist!'
+        market = markets[contract]
+        assert market is not None, 'Market does not exist!'
 
         assert amount > 0, 'Must be a positive LP point amount!'
         assert lp_points[contract, ctx.caller] >= amount, 'Not enough LP points to remove!'
 
-        token = I.import_module(contract)
+        assert verified[contract] is True, 'Invalid token interface!'
 
-        assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+        token = I.import_module(contract)
 
-        lp_percentage = amount / lp_points[contract]
+        currency_reserve, token_reserve, total_lp_points = market
 
-        currency_reserve, token_reserve = reserves[contract]
+        lp_percentage = amount / total_lp_points
 
         currency_amount = currency_reserve * decimal(lp_percentage)
         token_amount = token_reserve * decimal(lp_percentage)
@@ -121,16 +231,17 @@ def dex():
         token.transfer(to=ctx.caller, amount=token_amount)
 
         lp_points[contract, ctx.caller] -= amount
-        lp_points[contract] -= amount
+        update_position(contract, ctx.caller)
+        total_lp_points -= amount
 
-        assert lp_points[contract] > 1, 'Not enough remaining liquidity!'
+        assert total_lp_points > 1, 'Not enough remaining liquidity!'
 
         new_currency_reserve = currency_reserve - currency_amount
         new_token_reserve = token_reserve - token_amount
 
         assert new_currency_reserve > 0 and new_token_reserve > 0, 'Not enough remaining liquidity!'
 
-        reserves[contract] = [new_currency_reserve, new_token_reserve]
+        markets[contract] = [new_currency_reserve, new_token_reserve, total_lp_points]
         
         return currency_amount, token_amount
 
@@ -142,272 +253,711 @@ def dex():
         lp_points[contract, ctx.caller] -= amount
         lp_points[contract, to] += amount
 
+        update_position(contract, ctx.caller)
+        update_position(contract, to)
+
+    # Sets the allowance of to, instead of adding to it. Approve 0 to revoke
     @export
     def approve_liquidity(contract: str, to: str, amount: float):
-        assert amount > 0, 'Cannot send negative balances!'
-        lp_points[contract, ctx.caller, to] += amount
+        assert amount >= 0, 'Cannot approve negative balances!'
+        lp_allowances[contract, ctx.caller, to] = amount
+
+    # approve_liquidity for every approval, each a dict of contract, to and amount
+    @export
+    def approve_liquidity_many(approvals: list):
+        assert len(approvals) > 0, 'Must provide approvals!'
+
+        for approval in approvals:
+            amount = to_decimal(approval["amount"])
+
+            assert amount >= 0, 'Cannot approve negative balances!'
+            lp_allowances[approval["contract"], ctx.caller, approval["to"]] = amount
+
+    # Moves the caller's allowances from the version 1 layout (lp_points[contract, main_account, spender]) to lp_allowances
+    # Replaces any allowance already set in lp_allowances for a spender that has an old allowance
+    @export
+    def migrate_allowances(contract: str, spenders: list):
+        for spender in spenders:
+            allowance = lp_points[contract, ctx.caller, spender]
+            if allowance > 0:
+                lp_allowances[contract, ctx.caller, spender] = allowance
+                lp_points[contract, ctx.caller, spender] = None
 
     @export
     def transfer_liquidity_from(contract: str, to: str, main_account: str, amount: float):
         assert amount > 0, 'Cannot send negative balances!'
 
-        assert lp_points[contract, main_account, ctx.caller] >= amount, 'Not enough coins approved to send! You have ' \
-                                    '{} and are trying to spend {}'.format(lp_points[main_account, ctx.caller], amount)
+        allowance = lp_allowances[contract, main_account, ctx.caller]
+        assert allowance >= amount, 'Not enough LP points approved to send! You have ' \
+                                    '{} and are trying to spend {}'.format(allowance, amount)
 
         assert lp_points[contract, main_account] >= amount, 'Not enough coins to send!'
 
-        lp_points[contract, main_account, ctx.caller] -= amount
+        lp_allowances[contract, main_account, ctx.caller] = allowance - amount
         lp_points[contract, main_account] -= amount
 
         lp_points[contract, to] += amount
 
+        update_position(contract, main_account)
+        update_position(contract, to)
+
     # Buy takes fee from the crypto being transferred in
     @export
     def buy(contract: str, currency_amount: float, minimum_received: float=0, token_fees: bool=False):
-        assert pairs[contract] is not None, 'Market does not exist!'
+        assert markets[contract] is not None, 'Market does not exist!'
         assert currency_amount > 0, 'Must provide currency amount!'
 
-        token = I.import_module(contract)
-        amm_token = I.import_module(state["TOKEN_CONTRACT"])
+        config = load_config()
+        ledger = new_ledger()
 
-        assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+        assert verified[contract] is True, 'Invalid token interface!'
 
-        if contract == state["TOKEN_CONTRACT"]:
-            currency.transfer_from(amount=currency_amount, to=ctx.this, main_account=ctx.caller)
-            tokens_purchased = internal_buy(contract=state["TOKEN_CONTRACT"], currency_amount=currency_amount)
-            token.transfer(amount=tokens_purchased, to=ctx.caller)
-            
-            return tokens_purchased
-        
-        currency_reserve, token_reserve = reserves[contract]
-        k = currency_reserve * token_reserve
+        trade = calculate_buy_trade(contract, markets[contract], currency_amount, token_fees, config, None)
+        tokens_purchased = trade["amount"]
 
-        new_currency_reserve = currency_reserve + currency_amount
-        new_token_reserve = k / new_currency_reserve
+        if minimum_received != None:
+            assert tokens_purchased >= minimum_received, "Only {} tokens can be purchased, which is less than your minimum, which is {} tokens.".format(tokens_purchased, minimum_received)
 
-        tokens_purchased = token_reserve - new_token_reserve
-        
-        fee_percent = state["FEE_PERCENTAGE"] * discount[ctx.caller] #Discount is applied here
-        fee = tokens_purchased * fee_percent
-        
-        if token_fees is True:
-            fee = fee * state["TOKEN_DISCOUNT"]
-            
-            rswp_k = currency_reserve * token_reserve
+        apply_trade(contract, trade, config, ledger)
 
-            rswp_new_token_reserve = token_reserve + fee
-            rswp_new_currency_reserve = rswp_k / rswp_new_token_reserve
+        ledger["currency"] -= currency_amount
+        add_token(ledger, contract, tokens_purchased)
 
-            rswp_currency_purchased = currency_reserve - rswp_new_currency_reserve # MINUS FEE
-            rswp_currency_purchased += rswp_currency_purchased * fee_percent
-            
-            
-            rswp_currency_reserve_2, rswp_token_reserve_2 = reserves[state["TOKEN_CONTRACT"]] #This converts fees in TAU to fees in RSWP
-            rswp_k_2 = rswp_currency_reserve_2 * rswp_token_reserve_2
+        settle(config, ledger)
 
-            rswp_new_currency_reserve_2 = rswp_currency_reserve_2 + rswp_currency_purchased
-            rswp_new_currency_reserve_2 += rswp_currency_purchased * fee_percent #Not 100% accurate, uses output currency instead of input currency
-            rswp_new_token_reserve_2 = rswp_k_2 / rswp_new_currency_reserve_2
-            
-            sell_amount = rswp_token_reserve_2 - rswp_new_token_reserve_2 #SEMI-VOODOO MATH, PLEASE DOUBLE CHECK
-            sell_amount_with_fee = sell_amount * state["BURN_PERCENTAGE"]
-            
-            amm_token.transfer_from(amount=sell_amount, to=ctx.this, main_account=ctx.caller)
-            
-            currency_received = internal_sell(contract=state["TOKEN_CONTRACT"], token_amount=sell_amount_with_fee)
-            amm_token.transfer(amount=sell_amount - sell_amount_with_fee, to=state["BURN_ADDRESS"])
-            
-            token_received = internal_buy(contract=contract, currency_amount=currency_received)
-            new_token_reserve = decimal(new_token_reserve) + token_received #This can probably be removed during production
-        
-        else:
-            tokens_purchased = decimal(tokens_purchased) - fee
-            burn_amount = internal_buy(contract=state["TOKEN_CONTRACT"], currency_amount=internal_sell(contract=contract, token_amount=fee - fee * state["BURN_PERCENTAGE"]))
-            
-            new_token_reserve = decimal(new_token_reserve) + fee * state["BURN_PERCENTAGE"]
-            amm_token.transfer(amount=burn_amount, to=state["BURN_ADDRESS"]) #Burn here
+        return tokens_purchased
+
+    # Sell takes fee from crypto being transferred out
+    @export
+    def sell(contract: str, token_amount: float, minimum_received: float=0, token_fees: bool=False):
+        assert markets[contract] is not None, 'Market does not exist!'
+        assert token_amount > 0, 'Must provide currency amount and token amount!'
+
+        config = load_config()
+        ledger = new_ledger()
+
+        assert verified[contract] is True, 'Invalid token interface!'
+
+        trade = calculate_sell_trade(contract, markets[contract], token_amount, token_fees, config, None)
+        currency_purchased = trade["amount"]
+
+        if minimum_received != None: #!= because the type is not exact
+            assert currency_purchased >= minimum_received, "Only {} TAU can be purchased, which is less than your minimum, which is {} TAU.".format(currency_purchased, minimum_received)
+
+        apply_trade(contract, trade, config, ledger)
+
+        ledger["currency"] += currency_purchased
+        add_token(ledger, contract, -token_amount)
+
+        settle(config, ledger)
+
+        return currency_purchased
+
+    # Sells from_contract and buys to_contract with the TAU in one call. The TAU never leaves the contract
+    @export
+    def swap_tokens(from_contract: str, to_contract: str, amount: float, minimum_received: float=0, token_fees: bool=False):
+        assert markets[from_contract] is not None and markets[to_contract] is not None, 'Market does not exist!'
+        assert from_contract != to_contract, 'Cannot swap a token for itself!'
+        assert amount > 0, 'Must provide token amount!'
+
+        config = load_config()
+        ledger = new_ledger()
+
+        assert verified[from_contract] is True and verified[to_contract] is True, 'Invalid token interface!'
+
+        sell_trade = calculate_sell_trade(from_contract, markets[from_contract], amount, token_fees, config, None)
+
+        # The buy is calculated against the RSWP market the sell leaves behind, so nothing is written before the minimum is checked
+        rswp_market = None
+        if from_contract == config["TOKEN_CONTRACT"]:
+            rswp_market = sell_trade["market"]
+        elif sell_trade["token_fee"] is not None and sell_trade["token_fee"]["market"] is not None:
+            rswp_market = sell_trade["token_fee"]["market"]
+
+        to_market = markets[to_contract]
+        if to_contract == config["TOKEN_CONTRACT"] and rswp_market is not None:
+            to_market = rswp_market
+
+        buy_trade = calculate_buy_trade(to_contract, to_market, sell_trade["amount"], token_fees, config, rswp_market)
+        tokens_purchased = buy_trade["amount"]
 
         if minimum_received != None:
             assert tokens_purchased >= minimum_received, "Only {} tokens can be purchased, which is less than your minimum, which is {} tokens.".format(tokens_purchased, minimum_received)
-            
-        assert tokens_purchased > 0, 'Token reserve error!'
 
-        currency.transfer_from(amount=currency_amount, to=ctx.this, main_account=ctx.caller)
-        token.transfer(amount=tokens_purchased, to=ctx.caller)
+        apply_trade(from_contract, sell_trade, config, ledger)
+        apply_trade(to_contract, buy_trade, config, ledger)
+
+        add_token(ledger, from_contract, -amount)
+        add_token(ledger, to_contract, tokens_purchased)
+
+        settle(config, ledger)
 
-        reserves[contract] = [new_currency_reserve, new_token_reserve]
-        prices[contract] = new_currency_reserve / new_token_reserve
-        
         return tokens_purchased
 
-    # Sell takes fee from crypto being transferred out
+    # Executes orders in sequence, like separate buy/sell calls, but settles the caller's transfers once per token
+    # Each order is a dict of contract, side ("buy" or "sell"), amount, and optionally minimum_received and token_fees
+    # Every order is calculated and checked before any of them is written
     @export
-    def sell(contract: str, token_amount: float, minimum_received: float=0, token_fees: bool=False):
-        assert pairs[contract] is not None, 'Market does not exist!'
-        assert token_amount > 0, 'Must provide currency amount and token amount!'
+    def batch_trade(orders: list):
+        assert len(orders) > 0, 'Must provide orders!'
 
-        token = I.import_module(contract)
-        amm_token = I.import_module(state["TOKEN_CONTRACT"])
+        config = load_config()
+        ledger = new_ledger()
+        pending = {} #Market records as the orders calculated so far leave them
+        trades = []
+        results = []
 
-        assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+        for order in orders:
+            contract = order["contract"]
+            amount = to_decimal(order["amount"])
+            minimum_received = to_decimal(order.get("minimum_received", 0))
+            token_fees = order.get("token_fees", False)
 
-        if contract == state["TOKEN_CONTRACT"]:
-            token.transfer_from(amount=token_amount, to=ctx.this, main_account=ctx.caller)
-            currency_purchased = internal_sell(contract=state["TOKEN_CONTRACT"], token_amount=token_amount)
-            currency.transfer(amount=currency_purchased, to=ctx.caller)
-            
-            return currency_purchased
-        
-        currency_reserve, token_reserve = reserves[contract]
-        k = currency_reserve * token_reserve
+            assert markets[contract] is not None, 'Market does not exist!'
+            assert amount > 0, 'Must provide currency amount and token amount!'
+            assert verified[contract] is True, 'Invalid token interface!'
 
-        new_token_reserve = token_reserve + token_amount
+            market = pending.get(contract)
+            if market is None:
+                market = markets[contract]
 
-        new_currency_reserve = k / new_token_reserve
+            if order["side"] == "buy":
+                trade = calculate_buy_trade(contract, market, amount, token_fees, config, pending.get(config["TOKEN_CONTRACT"]))
 
-        currency_purchased = currency_reserve - new_currency_reserve # MINUS FEE
+            else:
+                assert order["side"] == "sell", 'Invalid order side!'
+                trade = calculate_sell_trade(contract, market, amount, token_fees, config, pending.get(config["TOKEN_CONTRACT"]))
 
-        fee_percent = state["FEE_PERCENTAGE"] * discount[ctx.caller] #Discount is applied here
-        fee = currency_purchased * fee_percent
-        
-        if token_fees is True:
-            fee = fee * state["TOKEN_DISCOUNT"]
-            rswp_currency_reserve, rswp_token_reserve = reserves[state["TOKEN_CONTRACT"]]
-            rswp_k = rswp_currency_reserve * rswp_token_reserve
+            received = trade["amount"]
 
-            rswp_new_currency_reserve = rswp_currency_reserve + fee
-            rswp_new_currency_reserve += fee * fee_percent #Not 100% accurate, uses output currency instead of input currency
-            rswp_new_token_reserve = rswp_k / rswp_new_currency_reserve
-            
-            sell_amount = rswp_token_reserve - rswp_new_token_reserve #SEMI-VOODOO MATH, PLEASE DOUBLE CHECK
-            sell_amount_with_fee = sell_amount * state["BURN_PERCENTAGE"]
-            
-            amm_token.transfer_from(amount=sell_amount, to=ctx.this, main_account=ctx.caller)
-            
-            currency_received = internal_sell(contract=state["TOKEN_CONTRACT"], token_amount=sell_amount_with_fee)
-            amm_token.transfer(amount=sell_amount - sell_amount_with_fee, to=state["BURN_ADDRESS"])
-            
-            new_currency_reserve = decimal(new_currency_reserve) + currency_received
-            
-        else:
-            currency_purchased = decimal(currency_purchased) - fee
-            burn_amount = fee - fee * state["BURN_PERCENTAGE"]
-            
-            new_currency_reserve = decimal(new_currency_reserve) + fee * state["BURN_PERCENTAGE"]
-            token_received = internal_buy(contract=state["TOKEN_CONTRACT"], currency_amount=burn_amount)
-            amm_token.transfer(amount=token_received, to=state["BURN_ADDRESS"]) #Buy and burn here
+            if minimum_received != None:
+                assert received >= minimum_received, "Only {} can be received, which is less than your minimum, which is {}.".format(received, minimum_received)
 
-        if minimum_received != None: #!= because the type is not exact
-            assert currency_purchased >= minimum_received, "Only {} TAU can be purchased, which is less than your minimum, which is {} TAU.".format(currency_purchased, minimum_received)
-            
-        assert currency_purchased > 0, 'Token reserve error!'
+            if trade["token_fee"] is not None and trade["token_fee"]["market"] is not None:
+                pending[config["TOKEN_CONTRACT"]] = trade["token_fee"]["market"]
 
-        token.transfer_from(amount=token_amount, to=ctx.this, main_account=ctx.caller)
-        currency.transfer(amount=currency_purchased, to=ctx.caller)
+            pending[contract] = trade["market"]
+            trades.append([contract, order["side"], amount, trade])
+            results.append(received)
 
-        reserves[contract] = [new_currency_reserve, new_token_reserve]
-        prices[contract] = new_currency_reserve / new_token_reserve
-        
-        return currency_purchased
+        for contract, side, amount, trade in trades:
+            apply_trade(contract, trade, config, ledger)
+
+            if side == "buy":
+                ledger["currency"] -= amount
+                add_token(ledger, contract, trade["amount"])
+
+            else:
+                ledger["currency"] += trade["amount"]
+                add_token(ledger, contract, -amount)
+
+        settle(config, ledger)
+
+        return results
+
+    # Read-only, mirrors buy without importing the token or writing anything
+    @export
+    def get_buy_quote(contract: str, currency_amount: float, token_fees: bool=False, account: str=None):
+        market = markets[contract]
+        assert market is not None, 'Market does not exist!'
+        assert currency_amount > 0, 'Must provide currency amount!'
+
+        if account == None:
+            account = ctx.caller
+
+        config = dict(settings.get())
+        config["DISCOUNT"] = get_discount(account, config, False)
+
+        trade = calculate_buy_trade(contract, market, currency_amount, token_fees, config, None)
+
+        return quote_trade(market, trade)
+
+    # Read-only, mirrors sell without importing the token or writing anything
+    @export
+    def get_sell_quote(contract: str, token_amount: float, token_fees: bool=False, account: str=None):
+        market = markets[contract]
+        assert market is not None, 'Market does not exist!'
+        assert token_amount > 0, 'Must provide currency amount and token amount!'
+
+        if account == None:
+            account = ctx.caller
+
+        config = dict(settings.get())
+        config["DISCOUNT"] = get_discount(account, config, False)
+
+        trade = calculate_sell_trade(contract, market, token_amount, token_fees, config, None)
+
+        return quote_trade(market, trade)
     
     @export
     def stake(amount: float, token_contract: str=None):
         assert amount >= 0, 'Must be a positive stake amount!'
+        config = settings.get()
         if token_contract == None:
-            token_contract = state["TOKEN_CONTRACT"]
+            token_contract = config["TOKEN_CONTRACT"]
         amm_token = I.import_module(token_contract)
         
         current_balance = staked_amount[ctx.caller, token_contract]
         
         if amount < current_balance: 
             amm_token.transfer(current_balance - amount, ctx.caller)
-            staked_amount[ctx.caller, token_contract] = amount #Rest of this can be abstracted in another function
-            discount_amount = state["LOG_ACCURACY"] * (staked_amount[ctx.caller, state["TOKEN_CONTRACT"]] ** (1 / state["LOG_ACCURACY"]) - 1) * state["MULTIPLIER"] - state["DISCOUNT_FLOOR"] #Calculates discount percentage
-            if discount_amount > 0.99: #Probably unnecessary, but added to prevent floating point and division by zero issues
-                discount_amount = 0.99
-            if discount_amount < 0:
-                discount_amount = 0
-            discount[ctx.caller] = 1 - discount_amount
-            
-            return discount_amount
         
         elif amount > current_balance: #Can replace with else, but this probably closes up a few edge cases like `if amount == current_balance`
             amm_token.transfer_from(amount - current_balance, ctx.this, ctx.caller)
-            staked_amount[ctx.caller, token_contract] = amount
-            discount_amount = state["LOG_ACCURACY"] * (staked_amount[ctx.caller, state["TOKEN_CONTRACT"]] ** (1 / state["LOG_ACCURACY"]) - 1) * state["MULTIPLIER"] - state["DISCOUNT_FLOOR"]
-            if discount_amount > 0.99:
-                discount_amount = 0.99
-            if discount_amount < 0:
-                discount_amount = 0
-            discount[ctx.caller] = 1 - discount_amount
-            
-            return discount_amount
+
+        else:
+            return None
+
+        staked_amount[ctx.caller, token_contract] = amount
+        staked_totals[token_contract] += amount - current_balance
+        discount_amount = calculate_discount(staked_amount[ctx.caller, config["TOKEN_CONTRACT"]], config)
+        discount[ctx.caller] = 1 - discount_amount #Stored as the fee multiplier used by buy and sell
+        discount_epochs[ctx.caller] = config["DISCOUNT_EPOCH"]
+        
+        return discount_amount
         
     @export
     def change_state(key: str, new_value: str, convert_to_decimal: bool=False):
-        assert state["OWNER"] == ctx.caller, "Not the owner!"
+        config = settings.get()
+        assert config["OWNER"] == ctx.caller, "Not the owner!"
+        assert key in state_keys, 'Invalid state key!'
         
         if convert_to_decimal:
             new_value = decimal(new_value)
-        state[key] = new_value
+
+        config[key] = new_value
+        if key in discount_keys: #Stored discounts are recalculated on their next use, see get_discount
+            config["DISCOUNT_EPOCH"] += 1
+            state["DISCOUNT_EPOCH"] = config["DISCOUNT_EPOCH"]
+
+        settings.set(config)
+        state[key] = new_value #Kept up to date for anything reading the state hash
         
         return new_value
         
+    # Sells the burn fees a market has collected, buys RSWP with the TAU and sends it to BURN_ADDRESS. Anyone can call this
+    @export
+    def flush_burns(contract: str):
+        assert markets[contract] is not None, 'Market does not exist!'
+
+        config = load_config()
+        currency_amount, token_amount = burn_fees[contract]
+
+        if token_amount > 0:
+            currency_amount += internal_sell(contract=contract, token_amount=token_amount, config=config)
+
+        assert currency_amount > 0 and currency_amount >= config["BURN_THRESHOLD"], 'Not enough fees to burn!'
+
+        burn_fees[contract] = [0, 0]
+
+        burn_amount = internal_buy(contract=config["TOKEN_CONTRACT"], currency_amount=currency_amount, config=config)
+        I.import_module(config["TOKEN_CONTRACT"]).transfer(amount=burn_amount, to=config["BURN_ADDRESS"])
+
+        return burn_amount
+
+    # Re-runs the token interface check of a market, e.g. after the token contract's interface changed
+    @export
+    def verify_market(contract: str):
+        assert settings.get()["OWNER"] == ctx.caller, "Not the owner!"
+        assert markets[contract] is not None, 'Market does not exist!'
+
+        result = I.enforce_interface(I.import_module(contract), token_interface)
+        verified[contract] = result
+
+        return result
+
     @export
     def sync_reserves(contract: str):
-        assert state["SYNC_ENABLED"] is True, "Sync is not enabled!" 
+        assert settings.get()["SYNC_ENABLED"] is True, "Sync is not enabled!" 
+        
+        return sync_market(contract)
+        
+    # sync_reserves for every market in contracts, in one transaction, which also syncs their currency reserves
+    @export
+    def sync_many(contracts: list):
+        assert settings.get()["SYNC_ENABLED"] is True, "Sync is not enabled!" 
+        assert len(contracts) > 0, 'Must provide contracts!'
+        
+        balances = []
+        synced = []
+        for contract in contracts:
+            balances.append(sync_market(contract))
+            if contract not in synced:
+                synced.append(contract)
+
+        sync_currency(synced)
+        
+        return balances
+        
+    # Internal use only, sets the token reserve of a market to the contract's balance
+    def sync_market(contract: str):
+        market = markets[contract]
+        assert market is not None, 'Market does not exist!'
         
         token = I.import_module(contract)
         
-        new_balance = token.balance_of(ctx.this)
+        new_balance = token.balance_of(ctx.this) - burn_fees[contract][1] - staked_totals[contract] #Fees waiting to be burned and staked tokens are not part of the reserves
         
         assert new_balance > 0, "Cannot be a negative balance!"
         
-        reserves[contract][1] = new_balance 
+        markets[contract] = [market[0], new_balance, market[2]]
         
         return new_balance
+
+    # Internal use only, the currency balance is shared by every market, so currency that no market, burn fee or stake
+    # accounts for is split between the currency reserves of contracts, in proportion to them
+    def sync_currency(contracts: list):
+        accounted = staked_totals["currency"]
+        for n in range(market_count.get()):
+            contract = market_index[n]
+            accounted += markets[contract][0] + burn_fees[contract][0]
+
+        difference = currency.balance_of(ctx.this) - accounted
+        if difference == 0:
+            return
+
+        synced_reserves = 0
+        for contract in contracts:
+            synced_reserves += markets[contract][0]
+
+        for contract in contracts:
+            market = markets[contract]
+            new_reserve = market[0] + difference * market[0] / synced_reserves
+            assert new_reserve > 0, "Cannot be a negative balance!"
+            markets[contract] = [new_reserve, market[1], market[2]]
         
+    # Internal use only, the price of a market record. The reserves can be ints, floats or decimals, so it is converted to a decimal
+    def price_of(market: list):
+        return decimal(str(market[0] / market[1]))
+
+    # Internal use only, keeps lp_positions[account] in step with lp_points[contract, account]
+    def update_position(contract: str, account: str):
+        positions = lp_positions[account]
+
+        if lp_points[contract, account] > 0:
+            if contract not in positions:
+                lp_positions[account] = positions + [contract] #A new list, so the default value is never changed
+
+        elif contract in positions:
+            lp_positions[account] = [position for position in positions if position != contract]
+
+    # Internal use only, adds a market to the end of market_index
+    def register_market(contract: str):
+        count = market_count.get()
+        market_index[count] = contract
+        market_count.set(count + 1)
+
+    # Internal use only, the values of state and the caller's discount, read once per call
+    def load_config():
+        config = dict(settings.get()) #Copied, so setting DISCOUNT does not change the stored settings
+        config["DISCOUNT"] = get_discount(ctx.caller, config, True)
+        return config
+
+    # Internal use only, returns the fee multiplier of an account. A discount from an older DISCOUNT_EPOCH is
+    # recalculated from the account's current stake, and saved if save is True
+    def get_discount(account: str, config: dict, save: bool):
+        if discount_epochs[account] == config["DISCOUNT_EPOCH"]:
+            return discount[account]
+
+        multiplier = 1 - calculate_discount(staked_amount[account, config["TOKEN_CONTRACT"]], config)
+
+        if save:
+            discount[account] = multiplier
+            discount_epochs[account] = config["DISCOUNT_EPOCH"]
+
+        return multiplier
+
+    # Internal use only, collects the transfers of a call so they can be settled once per token
+    # Positive amounts are owed to the caller, negative amounts are owed by the caller
+    def new_ledger():
+        return {"currency": 0, "tokens": {}, "modules": {}, "burn": 0}
+
     # Internal use only
-    def internal_buy(contract: str, currency_amount: float): 
-        assert pairs[contract] is not None, 'RSWP Market does not exist!'
-        if currency_amount <= 0:
-            return 0
+    def add_token(ledger: dict, contract: str, amount: float):
+        if contract not in ledger["tokens"]:
+            ledger["tokens"][contract] = 0
 
-        token = I.import_module(contract)
+        ledger["tokens"][contract] += amount
 
-        assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+    # Internal use only, imports each token once per call
+    def get_token(ledger: dict, contract: str):
+        if contract not in ledger["modules"]:
+            ledger["modules"][contract] = I.import_module(contract)
+
+        return ledger["modules"][contract]
+
+    # Internal use only, pulls everything owed by the caller first, then pays the caller and burns
+    def settle(config: dict, ledger: dict):
+        if ledger["currency"] < 0:
+            currency.transfer_from(amount=-ledger["currency"], to=ctx.this, main_account=ctx.caller)
+
+        for contract in ledger["tokens"]:
+            if ledger["tokens"][contract] < 0:
+                get_token(ledger, contract).transfer_from(amount=-ledger["tokens"][contract], to=ctx.this, main_account=ctx.caller)
+
+        if ledger["currency"] > 0:
+            currency.transfer(amount=ledger["currency"], to=ctx.caller)
+
+        for contract in ledger["tokens"]:
+            if ledger["tokens"][contract] > 0:
+                get_token(ledger, contract).transfer(amount=ledger["tokens"][contract], to=ctx.caller)
+
+        if ledger["burn"] > 0:
+            get_token(ledger, config["TOKEN_CONTRACT"]).transfer(amount=ledger["burn"], to=config["BURN_ADDRESS"])
+
+    # Internal use only, does not write anything. Used by buy and get_buy_quote, so a quote is always the trade
+    # rswp_market replaces the stored RSWP market for token fees, or is None to read it
+    # Returns the amount purchased, the new market record and the fee legs that apply_trade writes
+    def calculate_buy_trade(contract: str, market: list, currency_amount: float, token_fees: bool, config: dict, rswp_market: list):
+        currency_reserve, token_reserve, total_lp_points = market
+
+        if contract == config["TOKEN_CONTRACT"]:
+            tokens_purchased, new_currency_reserve, new_token_reserve = calculate_buy(currency_reserve, token_reserve, currency_amount, config)
+            return {"amount": tokens_purchased, "market": [new_currency_reserve, new_token_reserve, total_lp_points], "token_fee": None, "burn_fees": None}
 
-        currency_reserve, token_reserve = reserves[contract]
         k = currency_reserve * token_reserve
 
         new_currency_reserve = currency_reserve + currency_amount
         new_token_reserve = k / new_currency_reserve
 
         tokens_purchased = token_reserve - new_token_reserve
+        
+        fee_percent = config["FEE_PERCENTAGE"] * config["DISCOUNT"] #Discount is applied here
+        fee = tokens_purchased * fee_percent
 
-        fee = tokens_purchased * state["FEE_PERCENTAGE"]
+        token_fee = None
+        burn_fees = None
+        
+        if token_fees is True:
+            fee = fee * config["TOKEN_DISCOUNT"]
+            
+            rswp_k = currency_reserve * token_reserve
 
-        tokens_purchased -= fee
-        new_token_reserve += fee
+            rswp_new_token_reserve = token_reserve + fee
+            rswp_new_currency_reserve = rswp_k / rswp_new_token_reserve
+
+            rswp_currency_purchased = currency_reserve - rswp_new_currency_reserve # MINUS FEE
+            rswp_currency_purchased += rswp_currency_purchased * fee_percent
+
+            token_fee = calculate_token_fee(currency_fee=rswp_currency_purchased, fee_percent=fee_percent, config=config, rswp_market=rswp_market)
+
+            # The TAU buys tokens at the reserves before this trade, and the tokens stay in the pool
+            token_received = 0
+            if token_fee["currency_received"] > 0:
+                token_received = calculate_buy(currency_reserve, token_reserve, token_fee["currency_received"], config)[0]
+
+            new_token_reserve = decimal(new_token_reserve) + token_received #This can probably be removed during production
+        
+        else:
+            tokens_purchased = decimal(tokens_purchased) - fee
+            
+            new_token_reserve = decimal(new_token_reserve) + fee * config["BURN_PERCENTAGE"]
+            burn_fees = [0, fee - fee * config["BURN_PERCENTAGE"]] #Burned later by flush_burns
 
         assert tokens_purchased > 0, 'Token reserve error!'
 
-        reserves[contract] = [new_currency_reserve, new_token_reserve]
-        prices[contract] = new_currency_reserve / new_token_reserve
+        return {"amount": tokens_purchased, "market": [new_currency_reserve, new_token_reserve, total_lp_points], "token_fee": token_fee, "burn_fees": burn_fees}
+
+    # Internal use only, see calculate_buy_trade
+    def calculate_sell_trade(contract: str, market: list, token_amount: float, token_fees: bool, config: dict, rswp_market: list):
+        currency_reserve, token_reserve, total_lp_points = market
+
+        if contract == config["TOKEN_CONTRACT"]:
+            currency_purchased, new_currency_reserve, new_token_reserve = calculate_sell(currency_reserve, token_reserve, token_amount, config)
+            return {"amount": currency_purchased, "market": [new_currency_reserve, new_token_reserve, total_lp_points], "token_fee": None, "burn_fees": None}
+
+        k = currency_reserve * token_reserve
+
+        new_token_reserve = token_reserve + token_amount
+
+        new_currency_reserve = k / new_token_reserve
+
+        currency_purchased = currency_reserve - new_currency_reserve # MINUS FEE
+
+        fee_percent = config["FEE_PERCENTAGE"] * config["DISCOUNT"] #Discount is applied here
+        fee = currency_purchased * fee_percent
+
+        token_fee = None
+        burn_fees = None
+        
+        if token_fees is True:
+            fee = fee * config["TOKEN_DISCOUNT"]
+
+            token_fee = calculate_token_fee(currency_fee=fee, fee_percent=fee_percent, config=config, rswp_market=rswp_market)
+
+            new_currency_reserve = decimal(new_currency_reserve) + token_fee["currency_received"]
+            
+        else:
+            currency_purchased = decimal(currency_purchased) - fee
+            
+            new_currency_reserve = decimal(new_currency_reserve) + fee * config["BURN_PERCENTAGE"]
+            burn_fees = [fee - fee * config["BURN_PERCENTAGE"], 0] #Burned later by flush_burns
+
+        assert currency_purchased > 0, 'Token reserve error!'
+
+        return {"amount": currency_purchased, "market": [new_currency_reserve, new_token_reserve, total_lp_points], "token_fee": token_fee, "burn_fees": burn_fees}
+
+    # Internal use only, writes a trade from calculate_buy_trade or calculate_sell_trade and records its fee legs in the ledger
+    def apply_trade(contract: str, trade: dict, config: dict, ledger: dict):
+        if trade["token_fee"] is not None:
+            pay_token_fee(trade["token_fee"], config, ledger)
+
+        if trade["burn_fees"] is not None:
+            add_burn_fees(contract, trade["burn_fees"][0], trade["burn_fees"][1])
+
+        markets[contract] = trade["market"]
+
+    # Internal use only, the quote get_buy_quote and get_sell_quote return for a trade
+    def quote_trade(market: list, trade: dict):
+        rswp_fee = 0
+        if trade["token_fee"] is not None:
+            rswp_fee = trade["token_fee"]["rswp_fee"]
+
+        price_impact = price_of(trade["market"]) / price_of(market) - 1
+
+        return {"amount": trade["amount"], "price_impact": price_impact, "rswp_fee": rswp_fee}
+
+    # Internal use only, the discount percentage for an amount of staked RSWP
+    def calculate_discount(amount: float, config: dict):
+        discount_amount = 0
+        if amount > 0:
+            discount_amount = natural_log(amount) * config["MULTIPLIER"] - config["DISCOUNT_FLOOR"] #Calculates discount percentage
+            discount_amount = round(discount_amount, 12) #natural_log is only accurate to about 12 digits, and the fee math loses decimal precision with more
+
+        if discount_amount > 0.99: #Probably unnecessary, but added to prevent floating point and division by zero issues
+            discount_amount = 0.99
+        if discount_amount < 0:
+            discount_amount = 0
+
+        return discount_amount
+
+    # Internal use only, the executor only converts floats passed directly as arguments, not floats inside lists and dicts
+    def to_decimal(value: float):
+        if isinstance(value, float):
+            return decimal(str(value))
+
+        return value
+
+    # Internal use only, ln(value) from a table of powers of 2 and a short series, accurate to about 12 digits
+    # Replaces LOG_ACCURACY * (value ** (1 / LOG_ACCURACY) - 1), which needed a 60 digit fractional power
+    def natural_log(value: float):
+        value = decimal(str(value))
+        sign = 1
+        if value < 1:
+            value = 1 / value
+            sign = -1
+
+        # [eighths of a doubling, 2 ** (eighths / 8)], largest first
+        log2_table = [
+            [512, 18446744073709551616], [256, 4294967296], [128, 65536], [64, 256], [32, 16], [16, 4], [8, 2],
+            [4, decimal("1.414213562373095048801688724209")],
+            [2, decimal("1.189207115002721066717499970560")],
+            [1, decimal("1.090507732665257659207010655760")]
+        ]
+
+        eighths = 0
+        for step, power in log2_table:
+            while value >= power:
+                value = value / power
+                eighths += step
+
+        # value is now below 2 ** (1 / 8), so ln(value) = 2 * (y + y^3 / 3 + y^5 / 5 + y^7 / 7 + ...) converges quickly
+        y = (value - 1) / (value + 1)
+        y_squared = y * y
+        term = y
+        series = 0
+        for n in [1, 3, 5, 7]:
+            series += term / n
+            term = term * y_squared
+
+        return sign * (eighths * decimal("0.086643397569993163677154015182") + 2 * series) #ln(2) / 8 per eighth
+
+    # Internal use only, the fees stay in the contract outside of the reserves until flush_burns is called
+    def add_burn_fees(contract: str, currency_amount: float, token_amount: float):
+        currency_fees, token_fees = burn_fees[contract]
+        burn_fees[contract] = [currency_fees + currency_amount, token_fees + token_amount]
+
+    # Internal use only, does not write anything. Converts a fee in TAU to RSWP, which is pulled from the caller
+    # The part that isn't burned is sold on the RSWP market, which is read once. Returns the new RSWP market record and the TAU received
+    def calculate_token_fee(currency_fee: float, fee_percent: float, config: dict, rswp_market: list):
+        if rswp_market is None:
+            rswp_market = markets[config["TOKEN_CONTRACT"]]
+        assert rswp_market is not None, 'RSWP Market does not exist!'
+
+        rswp_currency_reserve, rswp_token_reserve, rswp_total_lp_points = rswp_market
+        rswp_k = rswp_currency_reserve * rswp_token_reserve
+
+        rswp_new_currency_reserve = rswp_currency_reserve + currency_fee
+        rswp_new_currency_reserve += currency_fee * fee_percent #Not 100% accurate, uses output currency instead of input currency
+        rswp_new_token_reserve = rswp_k / rswp_new_currency_reserve
+
+        sell_amount = rswp_token_reserve - rswp_new_token_reserve
+        sell_amount_with_fee = sell_amount * config["BURN_PERCENTAGE"]
+
+        token_fee = {"rswp_fee": sell_amount, "burn": sell_amount - sell_amount_with_fee, "currency_received": 0, "market": None}
+
+        if sell_amount_with_fee > 0:
+            currency_received, new_currency_reserve, new_token_reserve = calculate_sell(rswp_currency_reserve, rswp_token_reserve, sell_amount_with_fee, config)
+
+            token_fee["currency_received"] = currency_received
+            token_fee["market"] = [new_currency_reserve, new_token_reserve, rswp_total_lp_points]
+
+        return token_fee
+
+    # Internal use only, writes a fee from calculate_token_fee and records the RSWP in the ledger
+    def pay_token_fee(token_fee: dict, config: dict, ledger: dict):
+        add_token(ledger, config["TOKEN_CONTRACT"], -token_fee["rswp_fee"]) #Token fees are paid in RSWP
+        ledger["burn"] += token_fee["burn"]
+
+        if token_fee["market"] is not None:
+            markets[config["TOKEN_CONTRACT"]] = token_fee["market"]
+
+    # Internal use only
+    def internal_buy(contract: str, currency_amount: float, config: dict):
+        assert markets[contract] is not None, 'RSWP Market does not exist!'
+        if currency_amount <= 0:
+            return 0
+
+        currency_reserve, token_reserve, total_lp_points = markets[contract]
+        tokens_purchased, new_currency_reserve, new_token_reserve = calculate_buy(currency_reserve, token_reserve, currency_amount, config)
+
+        markets[contract] = [new_currency_reserve, new_token_reserve, total_lp_points]
         
         return tokens_purchased
 
     # Internal use only
-    def internal_sell(contract: str, token_amount: float):
-        assert pairs[contract] is not None, 'RSWP Market does not exist!'
+    def internal_sell(contract: str, token_amount: float, config: dict):
+        assert markets[contract] is not None, 'RSWP Market does not exist!'
         if token_amount <= 0:
             return 0
 
-        token = I.import_module(contract)
+        currency_reserve, token_reserve, total_lp_points = markets[contract]
+        currency_purchased, new_currency_reserve, new_token_reserve = calculate_sell(currency_reserve, token_reserve, token_amount, config)
 
-        assert I.enforce_interface(token, token_interface), 'Invalid token interface!'
+        markets[contract] = [new_currency_reserve, new_token_reserve, total_lp_points]
+        
+        return currency_purchased
 
-        currency_reserve, token_reserve = reserves[contract]
+    # Internal use only, does not write anything
+    def calculate_buy(currency_reserve: float, token_reserve: float, currency_amount: float, config: dict):
+        k = currency_reserve * token_reserve
+
+        new_currency_reserve = currency_reserve + currency_amount
+        new_token_reserve = k / new_currency_reserve
+
+        tokens_purchased = token_reserve - new_token_reserve
+
+        fee = tokens_purchased * config["FEE_PERCENTAGE"]
+
+        tokens_purchased -= fee
+        new_token_reserve += fee
+
+        assert tokens_purchased > 0, 'Token reserve error!'
+
+        return tokens_purchased, new_currency_reserve, new_token_reserve
+
+    # Internal use only, does not write anything
+    def calculate_sell(currency_reserve: float, token_reserve: float, token_amount: float, config: dict):
         k = currency_reserve * token_reserve
 
         new_token_reserve = token_reserve + token_amount
@@ -416,17 +966,14 @@ def dex():
 
         currency_purchased = currency_reserve - new_currency_reserve # MINUS FEE
 
-        fee = currency_purchased * state["FEE_PERCENTAGE"]
+        fee = currency_purchased * config["FEE_PERCENTAGE"]
 
         currency_purchased -= fee
         new_currency_reserve += fee
 
         assert currency_purchased > 0, 'Token reserve error!'
 
-        reserves[contract] = [new_currency_reserve, new_token_reserve]
-        prices[contract] = new_currency_reserve / new_token_reserve
-        
-        return currency_purchased
+        return currency_purchased, new_currency_reserve, new_token_reserve
 
 def return_contract(): # pragma: no cover
     client = ContractingClient()
@@ -0,0 +1,337 @@
+#Off-chain reference model of the dex() buy/sell math in dex_contract.py
+#Every value is computed with the same arithmetic operations in the same order as the contract, so when Contracting is
+#installed the results are bit-for-bit identical to what the contract would write. The code is not laid out like the
+#contract though: token fees are worked out step by step here, where the contract uses calculate_token_fee and
+#pay_token_fee. Nothing here touches a ContractingClient.
+#
+#A snapshot is two plain dicts:
+#   reserves = {contract: [currency_reserve, token_reserve]} (the first two values of what `dex.markets` holds)
+#   state = {"FEE_PERCENTAGE": ..., "TOKEN_CONTRACT": ..., "TOKEN_DISCOUNT": ..., "BURN_PERCENTAGE": ...} (what `dex.state` holds)
+#The snapshot is never mutated. Each quote returns the markets it touched, so callers can apply them if they want.
+from collections import ChainMap
+from decimal import Context, ROUND_FLOOR, localcontext
+
+try:
+    from contracting.stdlib.bridge.decimal import ContractingDecimal as decimal, CONTEXT
+    EXACT = True
+except ImportError: # pragma: no cover
+    #Same precision and rounding as Contracting, but without its 30 decimal place truncation, so results can
+    #differ from the contract in the last few digits
+    from decimal import Decimal as decimal
+    CONTEXT = Context(prec=60, rounding=ROUND_FLOOR, Emin=-100, Emax=100)
+    EXACT = False
+
+def to_decimal(value):
+    #The executor converts float kwargs the same way before calling the contract
+    if type(value) == float or (not EXACT and type(value) == int):
+        return decimal(str(value))
+    return value
+
+def to_stored(value):
+    #Stored values are used as they are, since the contract mixes ints, floats and decimals in storage
+    if EXACT:
+        return value
+    return to_decimal(value)
+
+def load_state(state):
+    #Storage converts top level floats to decimals (lists are stored as they are), so dex.state never holds a float
+    config = {key: to_decimal(state[key]) for key in ("FEE_PERCENTAGE", "TOKEN_DISCOUNT", "BURN_PERCENTAGE")}
+    config["TOKEN_CONTRACT"] = state["TOKEN_CONTRACT"]
+    return config
+
+def transfer(amount):
+    #Token transfers assert on non-positive amounts (see currency.c.py). Fee and burn transfers are settled by the
+    #contract only when they are positive, so they are not checked
+    assert amount > 0, 'Cannot send negative balances!'
+
+def get_reserves(reserves, touched, contract):
+    if contract in touched:
+        return touched[contract]
+    return [to_stored(reserve) for reserve in reserves[contract][:2]] #dex.markets records also hold the total LP points
+
+def internal_buy(reserves, touched, state, contract: str, currency_amount: float):
+    assert contract in reserves, 'RSWP Market does not exist!'
+    if currency_amount <= 0:
+        return 0
+
+    currency_reserve, token_reserve = get_reserves(reserves, touched, contract)
+    k = currency_reserve * token_reserve
+
+    new_currency_reserve = currency_reserve + currency_amount
+    new_token_reserve = k / new_currency_reserve
+
+    tokens_purchased = token_reserve - new_token_reserve
+
+    fee = tokens_purchased * state["FEE_PERCENTAGE"]
+
+    tokens_purchased -= fee
+    new_token_reserve += fee
+
+    assert tokens_purchased > 0, 'Token reserve error!'
+
+    touched[contract] = [new_currency_reserve, new_token_reserve]
+
+    return tokens_purchased
+
+def internal_sell(reserves, touched, state, contract: str, token_amount: float):
+    assert contract in reserves, 'RSWP Market does not exist!'
+    if token_amount <= 0:
+        return 0
+
+    currency_reserve, token_reserve = get_reserves(reserves, touched, contract)
+    k = currency_reserve * token_reserve
+
+    new_token_reserve = token_reserve + token_amount
+
+    new_currency_reserve = k / new_token_reserve
+
+    currency_purchased = currency_reserve - new_currency_reserve
+
+    fee = currency_purchased * state["FEE_PERCENTAGE"]
+
+    currency_purchased -= fee
+    new_currency_reserve += fee
+
+    assert currency_purchased > 0, 'Token reserve error!'
+
+    touched[contract] = [new_currency_reserve, new_token_reserve]
+
+    return currency_purchased
+
+def make_quote(amount, touched, rswp_fee=0, burned=0, burn_fees=None):
+    return {
+        "amount": amount, #Tokens (buy) or currency (sell) sent to the caller
+        "reserves": touched, #Post-trade reserves of every market the trade writes
+        "prices": {contract: touched[contract][0] / touched[contract][1] for contract in touched},
+        "rswp_fee": rswp_fee, #RSWP pulled from the caller when token_fees is True
+        "burned": burned, #RSWP sent to BURN_ADDRESS
+        "burn_fees": {} if burn_fees is None else burn_fees #{contract: [currency, tokens]} added to dex.burn_fees
+    }
+
+def buy(reserves, state, contract: str, currency_amount: float, discount=1, token_fees: bool=False):
+    currency_amount = to_decimal(currency_amount)
+    discount = to_decimal(discount)
+    state = load_state(state)
+    touched = {}
+
+    with localcontext(CONTEXT):
+        assert contract in reserves, 'Market does not exist!'
+        assert currency_amount > 0, 'Must provide currency amount!'
+
+        if contract == state["TOKEN_CONTRACT"]:
+            transfer(currency_amount)
+            tokens_purchased = internal_buy(reserves, touched, state, state["TOKEN_CONTRACT"], currency_amount)
+            transfer(tokens_purchased)
+
+            return make_quote(tokens_purchased, touched)
+
+        currency_reserve, token_reserve = get_reserves(reserves, touched, contract)
+        k = currency_reserve * token_reserve
+
+        new_currency_reserve = currency_reserve + currency_amount
+        new_token_reserve = k / new_currency_reserve
+
+        tokens_purchased = token_reserve - new_token_reserve
+
+        fee_percent = state["FEE_PERCENTAGE"] * discount
+        fee = tokens_purchased * fee_percent
+
+        if token_fees is True:
+            fee = fee * state["TOKEN_DISCOUNT"]
+
+            rswp_k = currency_reserve * token_reserve
+
+            rswp_new_token_reserve = token_reserve + fee
+            rswp_new_currency_reserve = rswp_k / rswp_new_token_reserve
+
+            rswp_currency_purchased = currency_reserve - rswp_new_currency_reserve
+            rswp_currency_purchased += rswp_currency_purchased * fee_percent
+
+            #The contract does these steps in one pass (pay_token_fee), with the same results
+            rswp_currency_reserve_2, rswp_token_reserve_2 = get_reserves(reserves, touched, state["TOKEN_CONTRACT"])
+            rswp_k_2 = rswp_currency_reserve_2 * rswp_token_reserve_2
+
+            rswp_new_currency_reserve_2 = rswp_currency_reserve_2 + rswp_currency_purchased
+            rswp_new_currency_reserve_2 += rswp_currency_purchased * fee_percent
+            rswp_new_token_reserve_2 = rswp_k_2 / rswp_new_currency_reserve_2
+
+            sell_amount = rswp_token_reserve_2 - rswp_new_token_reserve_2
+            sell_amount_with_fee = sell_amount * state["BURN_PERCENTAGE"]
+
+            currency_received = internal_sell(reserves, touched, state, state["TOKEN_CONTRACT"], sell_amount_with_fee)
+            burned = sell_amount - sell_amount_with_fee
+
+            token_received = internal_buy(reserves, touched, state, contract, currency_received)
+            new_token_reserve = decimal(new_token_reserve) + token_received
+            rswp_fee = sell_amount
+            burn_fees = None
+
+        else:
+            tokens_purchased = decimal(tokens_purchased) - fee
+
+            new_token_reserve = decimal(new_token_reserve) + fee * state["BURN_PERCENTAGE"]
+            burn_fees = {contract: [0, fee - fee * state["BURN_PERCENTAGE"]]} #Burned later by flush_burns
+            burned = 0
+            rswp_fee = 0
+
+        assert tokens_purchased > 0, 'Token reserve error!'
+
+        transfer(currency_amount)
+
+        #The final write replaces anything the token_fees legs wrote to this market
+        touched[contract] = [new_currency_reserve, new_token_reserve]
+
+        return make_quote(tokens_purchased, touched, rswp_fee, burned, burn_fees)
+
+def sell(reserves, state, contract: str, token_amount: float, discount=1, token_fees: bool=False):
+    token_amount = to_decimal(token_amount)
+    discount = to_decimal(discount)
+    state = load_state(state)
+    touched = {}
+
+    with localcontext(CONTEXT):
+        assert contract in reserves, 'Market does not exist!'
+        assert token_amount > 0, 'Must provide currency amount and token amount!'
+
+        if contract == state["TOKEN_CONTRACT"]:
+            transfer(token_amount)
+            currency_purchased = internal_sell(reserves, touched, state, state["TOKEN_CONTRACT"], token_amount)
+            transfer(currency_purchased)
+
+            return make_quote(currency_purchased, touched)
+
+        currency_reserve, token_reserve = get_reserves(reserves, touched, contract)
+        k = currency_reserve * token_reserve
+
+        new_token_reserve = token_reserve + token_amount
+
+        new_currency_reserve = k / new_token_reserve
+
+        currency_purchased = currency_reserve - new_currency_reserve
+
+        fee_percent = state["FEE_PERCENTAGE"] * discount
+        fee = currency_purchased * fee_percent
+
+        if token_fees is True:
+            fee = fee * state["TOKEN_DISCOUNT"]
+            rswp_currency_reserve, rswp_token_reserve = get_reserves(reserves, touched, state["TOKEN_CONTRACT"])
+            rswp_k = rswp_currency_reserve * rswp_token_reserve
+
+            rswp_new_currency_reserve = rswp_currency_reserve + fee
+            rswp_new_currency_reserve += fee * fee_percent
+            rswp_new_token_reserve = rswp_k / rswp_new_currency_reserve
+
+            sell_amount = rswp_token_reserve - rswp_new_token_reserve
+            sell_amount_with_fee = sell_amount * state["BURN_PERCENTAGE"]
+
+            currency_received = internal_sell(reserves, touched, state, state["TOKEN_CONTRACT"], sell_amount_with_fee)
+            burned = sell_amount - sell_amount_with_fee
+
+            new_currency_reserve = decimal(new_currency_reserve) + currency_received
+            rswp_fee = sell_amount
+            burn_fees = None
+
+        else:
+            currency_purchased = decimal(currency_purchased) - fee
+
+            new_currency_reserve = decimal(new_currency_reserve) + fee * state["BURN_PERCENTAGE"]
+            burn_fees = {contract: [fee - fee * state["BURN_PERCENTAGE"], 0]} #Burned later by flush_burns
+            burned = 0
+            rswp_fee = 0
+
+        assert currency_purchased > 0, 'Token reserve error!'
+
+        transfer(token_amount)
+
+        touched[contract] = [new_currency_reserve, new_token_reserve]
+
+        return make_quote(currency_purchased, touched, rswp_fee, burned, burn_fees)
+
+def swap_tokens(reserves, state, from_contract: str, to_contract: str, amount: float, discount=1, token_fees: bool=False):
+    #Same as the contract: sell from_contract, then buy to_contract with the TAU against the post-sell reserves
+    assert from_contract in reserves and to_contract in reserves, 'Market does not exist!'
+    assert from_contract != to_contract, 'Cannot swap a token for itself!'
+
+    sold = sell(reserves, state, from_contract, amount, discount, token_fees)
+    bought = buy(ChainMap(sold["reserves"], reserves), state, to_contract, sold["amount"], discount, token_fees)
+
+    touched = dict(sold["reserves"])
+    touched.update(bought["reserves"])
+
+    burn_fees = dict(sold["burn_fees"])
+    burn_fees.update(bought["burn_fees"])
+
+    with localcontext(CONTEXT):
+        return make_quote(bought["amount"], touched, sold["rswp_fee"] + bought["rswp_fee"], sold["burned"] + bought["burned"], burn_fees)
+
+def flush_burns(reserves, state, burn_fees, contract: str):
+    #burn_fees is the value of dex.burn_fees[contract], and state also needs BURN_THRESHOLD.
+    #Returns the RSWP flush_burns would send to BURN_ADDRESS
+    threshold = to_decimal(state["BURN_THRESHOLD"])
+    state = load_state(state)
+    touched = {}
+
+    with localcontext(CONTEXT):
+        assert contract in reserves, 'Market does not exist!'
+
+        currency_amount, token_amount = [to_stored(amount) for amount in burn_fees]
+
+        if token_amount > 0:
+            currency_amount += internal_sell(reserves, touched, state, contract, token_amount)
+
+        assert currency_amount > 0 and currency_amount >= threshold, 'Not enough fees to burn!'
+
+        burned = internal_buy(reserves, touched, state, state["TOKEN_CONTRACT"], currency_amount)
+        transfer(burned)
+
+        return make_quote(burned, touched, burned=burned)
+
+#Mirrors natural_log in the contract
+LOG2_TABLE = [
+    [512, 18446744073709551616], [256, 4294967296], [128, 65536], [64, 256], [32, 16], [16, 4], [8, 2],
+    [4, "1.414213562373095048801688724209"],
+    [2, "1.189207115002721066717499970560"],
+    [1, "1.090507732665257659207010655760"]
+]
+
+def natural_log(value):
+    value = decimal(str(value))
+    sign = 1
+    if value < 1:
+        value = 1 / value
+        sign = -1
+
+    eighths = 0
+    for step, power in LOG2_TABLE:
+        power = decimal(str(power))
+        while value >= power:
+            value = value / power
+            eighths += step
+
+    y = (value - 1) / (value + 1)
+    y_squared = y * y
+    term = y
+    series = 0
+    for n in [1, 3, 5, 7]:
+        series += term / n
+        term = term * y_squared
+
+    return sign * (eighths * decimal("0.086643397569993163677154015182") + 2 * series)
+
+def calculate_discount(amount, state):
+    #Returns the discount percentage stake gives for an amount of staked RSWP. The contract stores 1 - this in
+    #dex.discount, which is the discount argument of buy and sell. state also needs MULTIPLIER and DISCOUNT_FLOOR
+    with localcontext(CONTEXT):
+        amount = to_decimal(amount)
+
+        discount_amount = 0
+        if amount > 0:
+            discount_amount = natural_log(amount) * to_decimal(state["MULTIPLIER"]) - to_decimal(state["DISCOUNT_FLOOR"])
+            discount_amount = round(discount_amount, 12)
+
+        if discount_amount > 0.99:
+            discount_amount = 0.99
+        if discount_amount < 0:
+            discount_amount = 0
+
+        return discount_amount
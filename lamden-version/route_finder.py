@@ -0,0 +1,200 @@
+#Off-chain best route search over every market of the dex contract and of the uniswap-implementation dex_pairs
+#Markets are edges of a graph with tokens as nodes. Reserves are updated in place (O(1) per market), and the simple
+#paths between two tokens are cached until a market is added or removed, so a search only re-prices cached paths.
+#
+#Amounts use floats and leave out the RSWP burn legs and token_fees, so they are estimates. Use dex_quotes.py for
+#the exact amount of a dex trade.
+
+#Fee taken by dex_pairs swaps (UniswapV2 997/1000)
+PAIRS_FEE = 0.003
+
+class RouteFinder:
+    def __init__(self, max_hops=3):
+        self.max_hops = max_hops
+        self.pools = {} #pool -> {"tokens": (token_a, token_b), "reserves": [reserve_a, reserve_b], ...}
+        self.edges = {} #token -> {pool: other token}
+        self.links = {} #(token_a, token_b) -> [pools between them]
+        self.paths = {} #(token_in, token_out) -> [(pools, tokens)], cleared when the graph changes
+
+    def set_pool(self, pool, token_a, token_b, reserve_a, reserve_b, fee, fee_on_input=False, retained=1):
+        #fee_on_input: the fee is taken from the input (dex_pairs) instead of the output (dex)
+        #retained: share of an output fee that stays in the pool (the rest is burned)
+        assert token_a != token_b, 'Cannot create a market for a token and itself!'
+
+        if pool not in self.pools:
+            self.edges.setdefault(token_a, {})[pool] = token_b
+            self.edges.setdefault(token_b, {})[pool] = token_a
+            self.links.setdefault((token_a, token_b), []).append(pool)
+            self.links.setdefault((token_b, token_a), []).append(pool)
+            self.paths = {}
+
+        self.pools[pool] = {
+            "tokens": (token_a, token_b),
+            "reserves": [float(reserve_a), float(reserve_b)],
+            "fee": float(fee),
+            "fee_on_input": fee_on_input,
+            "retained": float(retained)
+        }
+
+    def update_reserves(self, pool, reserve_a, reserve_b):
+        assert pool in self.pools, 'Market does not exist!'
+        self.pools[pool]["reserves"] = [float(reserve_a), float(reserve_b)]
+
+    def remove_pool(self, pool):
+        token_a, token_b = self.pools.pop(pool)["tokens"]
+        del self.edges[token_a][pool]
+        del self.edges[token_b][pool]
+        self.links[token_a, token_b].remove(pool)
+        self.links[token_b, token_a].remove(pool)
+        self.paths = {}
+
+    def load_dex(self, reserves, state, discount=1, currency='currency'):
+        #reserves and state are snapshots of dex.markets and dex.state, like in dex_quotes.py
+        for contract in reserves:
+            self.set_dex_market(contract, reserves[contract][0], reserves[contract][1], state, discount, currency)
+
+    def set_dex_market(self, contract, currency_reserve, token_reserve, state, discount=1, currency='currency'):
+        if contract == state["TOKEN_CONTRACT"]:
+            #No discount, and internal_buy/internal_sell keep the whole fee in the pool
+            fee, retained = state["FEE_PERCENTAGE"], 1
+        else:
+            fee, retained = float(state["FEE_PERCENTAGE"]) * float(discount), state["BURN_PERCENTAGE"]
+
+        self.set_pool(('dex', contract), currency, contract, currency_reserve, token_reserve, fee, retained=retained)
+
+    def update_dex_market(self, contract, currency_reserve, token_reserve):
+        self.update_reserves(('dex', contract), currency_reserve, token_reserve)
+
+    def load_pairs(self, pairs):
+        #pairs: {(tau_contract, token_contract): (tau_reserve, token_reserve)}, like dex_pairs.get_pair_reserves
+        for tau_contract, token_contract in pairs:
+            tau_reserve, token_reserve = pairs[tau_contract, token_contract]
+            self.set_pool(('pairs', tau_contract, token_contract), tau_contract, token_contract, tau_reserve, token_reserve,
+                          PAIRS_FEE, fee_on_input=True)
+
+    def update_pair(self, tau_contract, token_contract, tau_reserve, token_reserve):
+        self.update_reserves(('pairs', tau_contract, token_contract), tau_reserve, token_reserve)
+
+    def get_paths(self, token_in, token_out):
+        key = (token_in, token_out)
+        if key not in self.paths:
+            paths = []
+            self.walk(token_in, token_out, [], [token_in], paths)
+            self.paths[key] = paths
+
+        return self.paths[key]
+
+    def walk(self, token, token_out, pools, tokens, paths):
+        #Depth first search of the simple paths with at most max_hops markets
+        hops_left = self.max_hops - len(pools)
+        for pool in self.links.get((token, token_out), ()):
+            paths.append((tuple(pools + [pool]), tuple(tokens + [token_out])))
+
+        if hops_left == 2:
+            #Join the last two hops from the token_out side, so a hub like TAU isn't expanded market by market
+            for pool_out, middle in self.edges.get(token_out, {}).items():
+                if middle not in tokens:
+                    for pool in self.links.get((token, middle), ()):
+                        paths.append((tuple(pools + [pool, pool_out]), tuple(tokens + [middle, token_out])))
+
+        elif hops_left > 2:
+            for pool, other in self.edges.get(token, {}).items():
+                if other != token_out and other not in tokens:
+                    self.walk(other, token_out, pools + [pool], tokens + [other], paths)
+
+    def swap(self, pool, token_in, amount_in, reserves):
+        #Returns (amount out, new reserves) of one hop. reserves overrides the stored reserves of pools already traded
+        market = self.pools[pool]
+        reserve_a, reserve_b = reserves.get(pool, market["reserves"])
+        if market["tokens"][0] == token_in:
+            reserve_in, reserve_out = reserve_a, reserve_b
+        else:
+            reserve_in, reserve_out = reserve_b, reserve_a
+
+        if reserve_in <= 0 or reserve_out <= 0:
+            return 0, None
+
+        if market["fee_on_input"]:
+            amount_in_with_fee = amount_in * (1 - market["fee"])
+            amount_out = amount_in_with_fee * reserve_out / (reserve_in + amount_in_with_fee)
+            new_reserve_out = reserve_out - amount_out
+        else:
+            gross = amount_in * reserve_out / (reserve_in + amount_in)
+            fee = gross * market["fee"]
+            amount_out = gross - fee
+            new_reserve_out = reserve_out - gross + fee * market["retained"]
+
+        if market["tokens"][0] == token_in:
+            return amount_out, [reserve_in + amount_in, new_reserve_out]
+        return amount_out, [new_reserve_out, reserve_in + amount_in]
+
+    def quote_path(self, pools, tokens, amount_in, reserves=None):
+        #Returns (amount out, new reserves of every pool on the path)
+        reserves = {} if reserves is None else reserves
+        touched = {}
+        amount = amount_in
+        for i in range(len(pools)):
+            amount, new_reserves = self.swap(pools[i], tokens[i], amount, reserves)
+            if amount <= 0:
+                return 0, touched
+            touched[pools[i]] = new_reserves
+
+        return amount, touched
+
+    def find_route(self, token_in, token_out, amount_in, max_routes=3, parts=10):
+        #Returns the best single path, or a split over up to max_routes paths if that receives more
+        assert amount_in > 0, 'Must provide input amount!'
+        assert token_in != token_out, 'Cannot route a token to itself!'
+
+        quotes = []
+        for pools, tokens in self.get_paths(token_in, token_out):
+            amount, touched = self.quote_path(pools, tokens, amount_in)
+            if amount > 0:
+                quotes.append((amount, pools, tokens))
+
+        assert len(quotes) > 0, 'No route found!'
+
+        quotes.sort(key=lambda quote: quote[0], reverse=True)
+        best_amount, best_pools, best_tokens = quotes[0]
+        best = {
+            "amount": best_amount,
+            "routes": [{"pools": best_pools, "path": best_tokens, "amount_in": amount_in, "amount": best_amount}]
+        }
+
+        candidates = quotes[:max_routes]
+        if len(candidates) < 2 or parts < 2:
+            return best
+
+        #Greedy split: every part goes to the path that receives the most for it, given the parts already placed.
+        #Paths sharing a market see each other's reserve changes through the shared reserves overlay.
+        part = amount_in / parts
+        reserves = {}
+        allocated = [0] * len(candidates)
+        for n in range(parts):
+            best_index, best_part, best_touched = None, 0, None
+            for i in range(len(candidates)):
+                amount, touched = self.quote_path(candidates[i][1], candidates[i][2], part, reserves)
+                if amount > best_part:
+                    best_index, best_part, best_touched = i, amount, touched
+
+            if best_index is None:
+                return best
+
+            allocated[best_index] += part
+            reserves.update(best_touched)
+
+        #Re-price each leg on its own, in order, so the amounts are what executing them one after another receives
+        reserves = {}
+        routes = []
+        total = 0
+        for i in range(len(candidates)):
+            if allocated[i] > 0:
+                amount, touched = self.quote_path(candidates[i][1], candidates[i][2], allocated[i], reserves)
+                reserves.update(touched)
+                routes.append({"pools": candidates[i][1], "path": candidates[i][2], "amount_in": allocated[i], "amount": amount})
+                total += amount
+
+        if total <= best_amount:
+            return best
+
+        return {"amount": total, "routes": routes}
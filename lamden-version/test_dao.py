@@ -0,0 +1,185 @@
+from unittest import TestCase
+from contracting.client import ContractingClient
+from contracting.stdlib.bridge.time import Datetime
+
+def day(n): #Every call passes its own time, so that proposals and checkpoints are in a known order
+    return {'now': Datetime(2100, 1, n)}
+
+class DAOTestCase(TestCase):
+    def setUp(self):
+        self.client = ContractingClient()
+        self.client.flush()
+
+        with open('currency.c.py') as f:
+            self.client.submit(f.read(), 'currency')
+
+        with open('con_dao.py') as f:
+            self.client.submit(f.read(), 'con_dao')
+
+        self.dao = self.client.get_contract('con_dao')
+        self.currency = self.client.get_contract('currency')
+
+        self.currency.transfer(amount=1000, to='con_dao')
+
+    def tearDown(self):
+        self.client.flush()
+
+    def create_proposal(self, time=2, duration=1):
+        return self.dao.change_approval_percentage(new_percentage=0.6, description='', voting_time_in_days=duration, signer='wallet1', environment=day(time))
+
+    def test_votes_weighted_by_power_before_proposal(self):
+        self.dao.transfer(amount=1000, to='stu', signer='wallet1', environment=day(1))
+        p_id = self.create_proposal()
+        self.dao.transfer(amount=500, to='jeff', signer='stu', environment=day(2)) #Same block as the proposal, not counted for either
+        self.dao.transfer(amount=500, to='jeff', signer='wallet1', environment=day(3))
+
+        self.assertEqual(self.dao.voting_power(account='stu', p_id=p_id), 1000)
+        self.assertEqual(self.dao.voting_power(account='jeff', p_id=p_id), 0)
+
+        self.dao.vote(p_id=p_id, result=True, signer='stu', environment=day(2))
+        self.dao.vote(p_id=p_id, result=True, signer='jeff', environment=day(2))
+
+        self.assertEqual(self.dao.tallies[p_id], [1000, 1000])
+        self.assertEqual(self.dao.balance_of(account='jeff'), 1000)
+
+    def test_vote_again_replaces_previous_vote(self):
+        self.dao.transfer(amount=1000, to='stu', signer='wallet1', environment=day(1))
+        p_id = self.create_proposal()
+
+        self.dao.vote(p_id=p_id, result=True, signer='stu', environment=day(2))
+        self.dao.vote(p_id=p_id, result=False, signer='stu', environment=day(2))
+
+        self.assertEqual(self.dao.tallies[p_id], [0, 1000])
+
+        self.dao.vote(p_id=p_id, result=True, signer='stu', environment=day(2))
+
+        self.assertEqual(self.dao.tallies[p_id], [1000, 1000])
+
+    def test_vote_fails_after_voting_ends(self):
+        p_id = self.create_proposal()
+
+        with self.assertRaises(AssertionError):
+            self.dao.vote(p_id=p_id, result=True, signer='wallet1', environment=day(3))
+
+        with self.assertRaises(AssertionError):
+            self.dao.vote(p_id=p_id + 1, result=True, signer='wallet1', environment=day(2))
+
+    def test_delegate_moves_power(self):
+        self.dao.transfer(amount=1000, to='stu', signer='wallet1', environment=day(1))
+        self.dao.delegate(to='jeff', signer='stu', environment=day(1))
+
+        self.assertEqual(self.dao.power['stu'], 0)
+        self.assertEqual(self.dao.power['jeff'], 1000)
+
+        self.dao.transfer(amount=400, to='bob', signer='stu', environment=day(1))
+
+        self.assertEqual(self.dao.power['jeff'], 600)
+        self.assertEqual(self.dao.power['bob'], 400)
+
+        p_id = self.create_proposal()
+        self.dao.delegate(to='stu', signer='stu', environment=day(2)) #Taking the power back does not change this proposal
+
+        self.assertEqual(self.dao.power['stu'], 600)
+        self.assertEqual(self.dao.power['jeff'], 0)
+        self.assertEqual(self.dao.voting_power(account='jeff', p_id=p_id), 600)
+        self.assertEqual(self.dao.voting_power(account='stu', p_id=p_id), 0)
+
+    def test_resolved_proposal_swaps_with_last_active(self):
+        for n in range(3):
+            self.create_proposal()
+
+        self.dao.vote(p_id=0, result=True, signer='wallet1', environment=day(2))
+        self.assertTrue(self.dao.determine_results(p_id=0, environment=day(3)))
+
+        self.assertEqual(self.dao.proposal_index['active', 'count'], 2)
+        self.assertEqual(self.dao.proposal_index['active', 0], 2)
+        self.assertEqual(self.dao.proposal_index['position', 2], 0)
+        self.assertEqual(self.dao.proposal_index['resolved', 'count'], 1)
+
+        self.assertEqual([p['p_id'] for p in self.dao.list_proposals(proposal_status='active', start=0, limit=10)], [2, 1])
+        self.assertEqual([p['p_id'] for p in self.dao.list_proposals(proposal_status='resolved', start=0, limit=10)], [0])
+        self.assertEqual([p['p_id'] for p in self.dao.list_proposals(proposal_status='all', start=1, limit=10)], [1, 2])
+
+        self.dao.determine_results(p_id=2, environment=day(3))
+
+        self.assertEqual(self.dao.proposal_index['active', 'count'], 1)
+        self.assertEqual(self.dao.proposal_index['active', 0], 1)
+        self.assertEqual(self.dao.proposal_index['resolved', 1], 2)
+
+    def test_proposal_information_has_every_field(self):
+        p_id = self.create_proposal()
+        info = self.dao.proposal_information(p_id=p_id)
+
+        self.assertEqual(info['type'], 'change_approval_percentage')
+        self.assertEqual(info['amount'], 0.6)
+        self.assertEqual(info['proposal_creator'], 'wallet1')
+        self.assertIsNone(info['reciever'])
+        self.assertIsNone(info['kwargs'])
+
+        self.assertIsNone(self.dao.proposal_information(p_id=p_id + 1)['type'])
+
+    def test_determine_results_fails_before_end_and_twice(self):
+        p_id = self.create_proposal()
+        self.dao.vote(p_id=p_id, result=True, signer='wallet1', environment=day(2))
+
+        with self.assertRaises(AssertionError):
+            self.dao.determine_results(p_id=p_id, environment=day(2))
+
+        self.dao.determine_results(p_id=p_id, environment=day(3))
+
+        with self.assertRaises(AssertionError):
+            self.dao.determine_results(p_id=p_id, environment=day(3))
+
+    def test_proposal_without_quorum_fails(self):
+        self.dao.transfer(amount=1000, to='stu', signer='wallet1', environment=day(1))
+        p_id = self.create_proposal()
+        self.dao.vote(p_id=p_id, result=True, signer='stu', environment=day(2))
+
+        self.assertFalse(self.dao.determine_results(p_id=p_id, environment=day(3)))
+        self.assertEqual(self.dao.required_approval_percentage.get(), 0.5)
+
+    def test_batch_proposal_runs_every_action(self):
+        p_id = self.dao.create_batch_proposal(actions=[
+            {'type': 'transfer', 'token_contract': 'currency', 'amount': 100, 'reciever': 'stu'},
+            {'type': 'change_minimum_duration', 'amount': 2},
+            {'type': 'mint', 'amount': 500, 'reciever': 'jeff'},
+            {'type': 'set_state', 'key': ['fee'], 'state': 'low'}
+        ], description='', voting_time_in_days=1, signer='wallet1', environment=day(2))
+
+        self.dao.vote(p_id=p_id, result=True, signer='wallet1', environment=day(2))
+        self.assertTrue(self.dao.determine_results(p_id=p_id, environment=day(3)))
+
+        self.assertEqual(self.currency.balance_of(account='stu'), 100)
+        self.assertEqual(self.dao.minimum_proposal_duration.get(), 2)
+        self.assertEqual(self.dao.balance_of(account='jeff'), 500)
+        self.assertEqual(self.dao.power['jeff'], 500)
+        self.assertEqual(self.dao.get_state(key=['fee']), 'low')
+
+    def test_failing_action_fails_batch(self):
+        p_id = self.dao.create_batch_proposal(actions=[
+            {'type': 'change_minimum_duration', 'amount': 2},
+            {'type': 'transfer', 'token_contract': 'currency', 'amount': 5000, 'reciever': 'stu'}
+        ], description='', voting_time_in_days=1, signer='wallet1', environment=day(2))
+
+        self.dao.vote(p_id=p_id, result=True, signer='wallet1', environment=day(2))
+
+        with self.assertRaises(AssertionError): #The DAO only holds 1000 currency
+            self.dao.determine_results(p_id=p_id, environment=day(3))
+
+    def test_batch_actions_are_checked(self):
+        bad_actions = [
+            {'type': 'burn', 'amount': 1},
+            {'type': 'transfer', 'token_contract': 'currency', 'amount': 1},
+            {'type': 'transfer', 'token_contract': 'currency', 'amount': '1', 'reciever': 'stu'},
+            {'type': 'change_approval_percentage', 'amount': 2},
+            {'type': 'change_active_contract', 'contract': 1},
+            {'type': 'sign_custom_transaction', 'contract': 'con_thing', 'function': 'run', 'kwargs': []},
+            {'type': 'mint', 'amount': 0, 'reciever': 'stu'},
+            {'type': 'set_state', 'key': ['fee']}
+        ]
+
+        for action in bad_actions:
+            with self.assertRaises(AssertionError):
+                self.dao.create_batch_proposal(actions=[action], description='', voting_time_in_days=1, signer='wallet1', environment=day(2))
+
+        self.assertEqual(self.dao.proposal_id.get(), 0)
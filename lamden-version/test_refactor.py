@@ -2,6 +2,9 @@ from unittest import TestCase
 from contracting.client import ContractingClient
 from decimal import Decimal #To fix some unittest concatenation issues
 import dex_contract
+import dex_quotes
+import batch_quotes
+import route_finder
 
 def bad_token():
     @export
@@ -44,7 +47,45 @@ class MyTestCase(TestCase):
 
         self.dex.transfer_liquidity_from(contract='con_token1', to='stu', main_account='sys', amount=20, signer='jeff')
 
-        self.assertEqual(self.dex.lp_points['con_token1', 'sys', 'jeff'], 0)
+        self.assertEqual(self.dex.lp_allowances['con_token1', 'sys', 'jeff'], 0)
+
+    def test_approve_liquidity_sets_allowance(self):
+        self.dex.approve_liquidity(contract='con_token1', to='jeff', amount=20)
+        self.dex.approve_liquidity(contract='con_token1', to='jeff', amount=5)
+
+        self.assertEqual(self.dex.lp_allowances['con_token1', 'sys', 'jeff'], 5)
+
+        self.dex.approve_liquidity(contract='con_token1', to='jeff', amount=0)
+
+        self.assertEqual(self.dex.lp_allowances['con_token1', 'sys', 'jeff'], 0)
+
+    def test_approve_liquidity_many_works(self):
+        self.dex.approve_liquidity_many(approvals=[
+            {"contract": 'con_token1', "to": 'jeff', "amount": 20},
+            {"contract": 'con_amm', "to": 'jeff', "amount": 2.5},
+            {"contract": 'con_token1', "to": 'stu', "amount": 10}
+        ])
+
+        self.assertEqual(self.dex.lp_allowances['con_token1', 'sys', 'jeff'], 20)
+        self.assertEqual(self.dex.lp_allowances['con_amm', 'sys', 'jeff'], 2.5)
+        self.assertEqual(self.dex.lp_allowances['con_token1', 'sys', 'stu'], 10)
+
+    def test_migrate_allowances_works(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
+
+        #Version 1 layout
+        self.dex.quick_write('lp_points', 'con_token1', 20, args=['sys', 'jeff'])
+
+        self.dex.migrate_allowances(contract='con_token1', spenders=['jeff', 'stu'])
+
+        self.client.raw_driver.commit() #Reads fall through a deleted key in the cache until it is committed
+        self.assertIsNone(self.dex.quick_read('lp_points', 'con_token1', args=['sys', 'jeff']))
+        self.assertEqual(self.dex.lp_allowances['con_token1', 'sys', 'jeff'], 20)
+
+        self.dex.transfer_liquidity_from(contract='con_token1', to='stu', main_account='sys', amount=20, signer='jeff')
 
     def test_transfer_liquidity_from_fails_if_not_enough_in_main_account(self):
         self.currency.approve(amount=1000, to='dex')
@@ -144,6 +185,33 @@ class MyTestCase(TestCase):
         self.assertEqual(self.currency.balance_of(account='stu'), 200)
         self.assertEqual(self.token1.balance_of(account='stu'), 200)
 
+    def test_liquidity_positions_follow_lp_points(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=100)
+
+        self.assertEqual(self.dex.liquidity_positions_of(account='sys'), [
+            {"contract": 'con_amm', "lp_points": 100},
+            {"contract": 'con_token1', "lp_points": 100}
+        ])
+
+        self.dex.transfer_liquidity(contract='con_token1', amount=20, to='stu')
+        self.assertEqual(self.dex.liquidity_positions_of(account='stu'), [{"contract": 'con_token1', "lp_points": 20}])
+
+        self.dex.remove_liquidity(contract='con_token1', amount=20, signer='stu')
+        self.assertEqual(self.dex.liquidity_positions_of(account='stu'), [])
+
+        self.dex.transfer_liquidity(contract='con_amm', amount=100, to='stu')
+        self.assertEqual(self.dex.liquidity_positions_of(account='sys'), [{"contract": 'con_token1', "lp_points": 80}])
+        self.assertEqual(self.dex.liquidity_positions_of(account='stu'), [{"contract": 'con_amm', "lp_points": 100}])
+
+    def test_index_position_adds_migrated_lp_points(self):
+        self.dex.quick_write('lp_points', 'con_token1', 50, args=['stu'])
+
+        self.assertEqual(self.dex.index_position(contract='con_token1', account='stu', signer='jeff'), ['con_token1'])
+        self.assertEqual(self.dex.liquidity_positions_of(account='stu'), [{"contract": 'con_token1', "lp_points": 50}])
+
     def test_remove_liquidity_zero_or_neg_fails(self):
         self.currency.approve(amount=1000, to='dex')
         self.token1.approve(amount=1000, to='dex')
@@ -235,9 +303,9 @@ class MyTestCase(TestCase):
 
         self.dex.remove_liquidity(contract='con_token1', amount=25, signer='stu')
 
-        # self.assertEqual(self.dex.lp_points['con_token1'], 75)
+        # self.assertEqual(self.dex.markets['con_token1'][2], 75)
 
-        self.assertEqual(self.dex.reserves['con_token1'], [75, 750])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [75, 750])
 
     def test_remove_liquidity_updates_tokens(self):
         self.currency.transfer(amount=100, to='stu')
@@ -250,7 +318,7 @@ class MyTestCase(TestCase):
 
         self.dex.remove_liquidity(contract='con_token1', amount=25, signer='stu')
 
-        self.assertEqual(self.dex.lp_points['con_token1'], 75)
+        self.assertEqual(self.dex.markets['con_token1'][2], 75)
         self.assertEqual(self.dex.lp_points['con_token1', 'stu'], 75)
 
     def test_remove_liquidity_after_additional_add_works(self):
@@ -387,6 +455,8 @@ class MyTestCase(TestCase):
         
         with self.assertRaises(AssertionError):
             self.dex.buy(contract='con_token1', currency_amount=10, minimum_received=100, signer='stu')
+
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
         
     def test_buy_with_token_fees_below_minimum_recieved_fails(self):        
         self.currency.transfer(amount=110, to='stu')
@@ -416,7 +486,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
 
@@ -427,7 +497,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 + (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
         
     def test_buy_updates_price(self):
         self.currency.transfer(amount=110, to='stu')
@@ -438,7 +508,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
@@ -449,7 +519,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 + (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
 
     def test_buy_sell_updates_price_almost_to_original(self):
         self.currency.transfer(amount=110, to='stu')
@@ -477,7 +547,7 @@ class MyTestCase(TestCase):
 
         price_impact = 0.3 / (100 * 10) * 0.8
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], 0.1 * (1 + price_impact * 2), 4)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), 0.1 * (1 + price_impact * 2), 4)
         
     def test_buy_sell_with_token_fees_updates_price_almost_to_original(self):
         self.currency.transfer(amount=110, to='stu')
@@ -507,7 +577,7 @@ class MyTestCase(TestCase):
 
         price_impact = 0.3 / (100 * 10) * 0.8 * 0.75
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], 0.1 * (1 + price_impact * 2), 4)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), 0.1 * (1 + price_impact * 2), 4)
 
     def test_buy_updates_reserves(self):
         self.currency.transfer(amount=110, to='stu')
@@ -518,13 +588,13 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
         fee = (1000 - 909.090909090909091) * (0.3 / 100) * 0.8
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertEqual(cur_res, 110)
         self.assertAlmostEqual(tok_res, 909.090909090909091 + fee)
@@ -540,13 +610,13 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
 
         fee = (1000 - 909.090909090909091) * (0.3 / 100) * 0.8 * 0.75
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertEqual(cur_res, 110)
         self.assertAlmostEqual(Decimal(tok_res), Decimal(909.090909090909091 + fee), 4) #To account for slippage on the RSWP/TAU pair
@@ -601,11 +671,11 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
 
-        print(0.098029604940692 / self.dex.prices['con_token1'])
+        print(0.098029604940692 / self.dex.get_price(contract='con_token1'))
 
         # Because of fees, the amount left in the reserves differs
         expected_price = 0.098029604940692
@@ -614,7 +684,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 - (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
         
     def test_sell_with_token_fees_updates_price(self):
         self.currency.transfer(amount=100, to='stu')
@@ -627,11 +697,11 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=10, token_fees=True, signer='stu')
 
-        print(0.098029604940692 / self.dex.prices['con_token1'])
+        print(0.098029604940692 / self.dex.get_price(contract='con_token1'))
 
         # Because of fees, the amount left in the reserves differs
         expected_price = 0.098029604940692
@@ -640,7 +710,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 - (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
 
     def test_sell_updates_reserves(self):
         self.currency.transfer(amount=100, to='stu')
@@ -651,13 +721,13 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
 
         fee = (100 - 99.00990099009901) * (0.3 / 100) * 0.8
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertAlmostEqual(cur_res, 99.00990099009901 + fee)
         self.assertEqual(tok_res, 1010)
@@ -673,13 +743,13 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.sell(contract='con_token1', token_amount=10, token_fees=True, signer='stu')
 
         fee = (100 - 99.00990099009901) * (0.3 / 100) * 0.8 * 0.75
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertAlmostEqual(cur_res, Decimal(99.00990099009901) + Decimal(fee))
         self.assertEqual(tok_res, Decimal(1010))
@@ -715,6 +785,115 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
 
+    def test_create_market_verifies_interface(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.assertFalse(self.dex.verified['con_token1'])
+
+        self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
+
+        self.assertEqual(self.dex.verified['con_token1'], True)
+
+    def test_unverified_market_fails(self):
+        self.currency.approve(amount=1010, to='dex')
+        self.token1.approve(amount=1010, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
+        self.dex.quick_write('verified', 'con_token1', False)
+
+        with self.assertRaises(AssertionError):
+            self.dex.buy(contract='con_token1', currency_amount=1)
+
+        with self.assertRaises(AssertionError):
+            self.dex.sell(contract='con_token1', token_amount=1)
+
+        with self.assertRaises(AssertionError):
+            self.dex.add_liquidity(contract='con_token1', currency_amount=1)
+
+        self.assertEqual(self.dex.verify_market(contract='con_token1'), True)
+
+        self.dex.buy(contract='con_token1', currency_amount=1)
+
+    def test_verify_market_not_owner_fails(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
+
+        with self.assertRaises(AssertionError):
+            self.dex.verify_market(contract='con_token1', signer='stu')
+
+        with self.assertRaises(AssertionError):
+            self.dex.verify_market(contract='con_token2')
+
+    def test_migrate_market_works(self):
+        self.currency.transfer(amount=100, to='dex')
+        self.token1.transfer(amount=1000, to='dex')
+
+        #Version 1 layout
+        self.dex.quick_write('pairs', 'con_token1', True)
+        self.dex.quick_write('reserves', 'con_token1', [100, 1000])
+        self.dex.quick_write('prices', 'con_token1', 0.1)
+        self.dex.quick_write('lp_points', 'con_token1', 100)
+
+        with self.assertRaises(AssertionError):
+            self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+
+        self.assertEqual(self.dex.migrate_market(contract='con_token1', signer='stu'), [100, 1000, 100])
+
+        self.client.raw_driver.commit() #Reads fall through a deleted key in the cache until it is committed
+        self.assertIsNone(self.dex.quick_read('reserves', 'con_token1'))
+        self.assertEqual(self.dex.markets['con_token1'], [100, 1000, 100])
+        self.assertEqual(self.dex.verified['con_token1'], True)
+        self.assertEqual(self.dex.get_price(contract='con_token1'), 0.1)
+        self.assertEqual(self.dex.list_markets(start=0, limit=50)[1]["contract"], 'con_token1')
+
+        with self.assertRaises(AssertionError):
+            self.dex.migrate_market(contract='con_token1')
+
+        self.currency.approve(amount=10, to='dex')
+        self.dex.buy(contract='con_token1', currency_amount=10)
+
+    def test_migrate_market_fails_if_no_market(self):
+        with self.assertRaises(AssertionError):
+            self.dex.migrate_market(contract='con_token1')
+
+    def test_list_markets_works(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.assertEqual(self.dex.list_markets(start=0, limit=50), [{"contract": 'con_amm', "currency_reserve": 1000, "token_reserve": 1000}])
+
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+
+        self.assertEqual(self.dex.market_count.get(), 2)
+        self.assertEqual(self.dex.list_markets(start=0, limit=50), [
+            {"contract": 'con_amm', "currency_reserve": 1000, "token_reserve": 1000},
+            {"contract": 'con_token1', "currency_reserve": 100, "token_reserve": 1000}
+        ])
+
+        self.assertEqual(self.dex.list_markets(start=1, limit=1), [{"contract": 'con_token1', "currency_reserve": 100, "token_reserve": 1000}])
+        self.assertEqual(self.dex.list_markets(start=2, limit=50), [])
+
+        with self.assertRaises(AssertionError):
+            self.dex.list_markets(start=0, limit=0)
+
+    def test_get_markets_state_works(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+        self.dex.transfer_liquidity(contract='con_amm', to='stu', amount=20)
+
+        self.assertEqual(self.dex.get_markets_state(contracts=['con_token1', 'con_amm'], account='stu'), [
+            {"contract": 'con_token1', "currency_reserve": 100, "token_reserve": 1000, "price": 0.1, "total_lp_points": 100, "lp_points": 0},
+            {"contract": 'con_amm', "currency_reserve": 1000, "token_reserve": 1000, "price": 1, "total_lp_points": 100, "lp_points": 20}
+        ])
+
+        with self.assertRaises(AssertionError):
+            self.dex.get_markets_state(contracts=['con_token2'], account='stu')
+
     def test_create_market_sends_coins_to_dex(self):
         self.currency.approve(amount=1000, to='dex')
         self.token1.approve(amount=1000, to='dex')
@@ -733,7 +912,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
 
-        self.assertEqual(self.dex.reserves['con_token1'], [1000, 1000])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [1000, 1000])
 
     def test_create_market_mints_100_lp_points(self):
         self.currency.approve(amount=1000, to='dex')
@@ -749,7 +928,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
 
-        self.dex.lp_points['con_token1'] = 100
+        self.assertEqual(self.dex.markets['con_token1'][2], 100)
 
     def test_create_market_sets_tau_reserve_to_currency_amount(self):
         self.currency.approve(amount=1000, to='dex')
@@ -763,7 +942,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
 
-        self.assertEqual(self.dex.prices['con_token1'], 0.1)
+        self.assertEqual(self.dex.get_price(contract='con_token1'), 0.1)
 
     def test_create_market_sets_pair_to_true(self):
         self.currency.approve(amount=1000, to='dex')
@@ -771,7 +950,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=1000, token_amount=1000)
 
-        self.assertTrue(self.dex.pairs['con_token1'])
+        self.assertIsNotNone(self.dex.markets['con_token1'])
 
     def test_create_market_twice_throws_assertion(self):
         self.currency.approve(amount=1000, to='dex')
@@ -819,7 +998,7 @@ class MyTestCase(TestCase):
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
 
         self.assertEqual(self.dex.lp_points['con_token1', 'sys'], 100)
-        self.assertEqual(self.dex.lp_points['con_token1'], 100)
+        self.assertEqual(self.dex.markets['con_token1'][2], 100)
 
         self.currency.transfer(amount=10000, to='stu')
         self.token1.transfer(amount=10000, to='stu')
@@ -831,7 +1010,7 @@ class MyTestCase(TestCase):
 
         self.assertEqual(self.dex.lp_points['con_token1', 'sys'], 100)
         self.assertEqual(self.dex.lp_points['con_token1', 'stu'], 50)
-        self.assertEqual(self.dex.lp_points['con_token1'], 150)
+        self.assertEqual(self.dex.markets['con_token1'][2], 150)
 
     def test_add_liquidity_updates_reserves_correctly(self):
         self.currency.approve(amount=10000, to='dex')
@@ -839,7 +1018,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
 
-        self.assertEqual(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.currency.transfer(amount=10000, to='stu')
         self.token1.transfer(amount=10000, to='stu')
@@ -849,7 +1028,7 @@ class MyTestCase(TestCase):
 
         self.dex.add_liquidity(contract='con_token1', currency_amount=50, signer='stu')
 
-        self.assertEqual(self.dex.reserves['con_token1'], [150, 1500])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [150, 1500])
 
     def test_remove_liquidity_after_buy_collects_token_fees(self):
         self.currency.transfer(amount=110, to='stu')
@@ -860,7 +1039,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
@@ -868,7 +1047,7 @@ class MyTestCase(TestCase):
 
         # Removing 25% of the liquidity returns 25% of the fees collected
 
-        cur_reserves, token_reserves = self.dex.reserves['con_token1']
+        cur_reserves, token_reserves = self.dex.markets['con_token1'][:2]
 
         self.dex.remove_liquidity(contract='con_token1', amount=25, signer='stu')
 
@@ -886,7 +1065,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
 
@@ -894,7 +1073,7 @@ class MyTestCase(TestCase):
 
         # Removing 25% of the liquidity returns 25% of the fees collected
 
-        cur_reserves, token_reserves = self.dex.reserves['con_token1']
+        cur_reserves, token_reserves = self.dex.markets['con_token1'][:2]
 
         self.dex.remove_liquidity(contract='con_token1', amount=25, signer='stu')
 
@@ -910,14 +1089,14 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=100, signer='stu')
 
         purchased_currency = self.currency.balances['stu']
 
         # Removing 25% of the liquidity returns 25% of the fees collected
-        cur_reserves, token_reserves = self.dex.reserves['con_token1']
+        cur_reserves, token_reserves = self.dex.markets['con_token1'][:2]
 
         self.dex.remove_liquidity(contract='con_token1', amount=25, signer='stu')
 
@@ -935,14 +1114,14 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=100, token_fees=True, signer='stu')
 
         purchased_currency = self.currency.balances['stu']
 
         # Removing 25% of the liquidity returns 25% of the fees collected
-        cur_reserves, token_reserves = self.dex.reserves['con_token1']
+        cur_reserves, token_reserves = self.dex.markets['con_token1'][:2]
 
         self.dex.remove_liquidity(contract='con_token1', amount=25, signer='stu')
 
@@ -965,13 +1144,13 @@ class MyTestCase(TestCase):
 
         self.dex.add_liquidity(contract='con_token1', currency_amount=25, signer='stu')
 
-        self.assertAlmostEqual(float(self.dex.lp_points['con_token1', 'stu'] / self.dex.lp_points['con_token1']), 0.25)
+        self.assertAlmostEqual(float(self.dex.lp_points['con_token1', 'stu'] / self.dex.markets['con_token1'][2]), 0.25)
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
         purchased_tokens = self.token1.balances['stu']
 
-        cur_reserves, token_reserves = self.dex.reserves['con_token1']
+        cur_reserves, token_reserves = self.dex.markets['con_token1'][:2]
 
         self.dex.remove_liquidity(contract='con_token1', amount=33.33333333333331, signer='stu')
 
@@ -993,13 +1172,13 @@ class MyTestCase(TestCase):
 
         self.dex.add_liquidity(contract='con_token1', currency_amount=25, signer='stu')
 
-        self.assertAlmostEqual(float(self.dex.lp_points['con_token1', 'stu'] / self.dex.lp_points['con_token1']), 0.25)
+        self.assertAlmostEqual(float(self.dex.lp_points['con_token1', 'stu'] / self.dex.markets['con_token1'][2]), 0.25)
 
         self.dex.sell(contract='con_token1', token_amount=100, signer='stu')
 
         purchased_currency = self.currency.balances['stu']
 
-        cur_reserves, token_reserves = self.dex.reserves['con_token1']
+        cur_reserves, token_reserves = self.dex.markets['con_token1'][:2]
 
         self.dex.remove_liquidity(contract='con_token1', amount=33.33333333333331, signer='stu')
 
@@ -1093,6 +1272,17 @@ class MyTestCase(TestCase):
         
         self.assertAlmostEquals(self.dex.discount['stu'], 1 - accuracy * (100 ** (1 / accuracy) - 1) * multiplier)
         
+    def test_stake_discount_matches_quote(self):
+        self.amm.transfer(amount=1000, to='stu')
+        self.amm.approve(amount=1000, to='dex', signer='stu')
+        
+        state = {"MULTIPLIER": 0.05, "DISCOUNT_FLOOR": 0.0}
+        for amount in [0.5, 2, 100, 1000]:
+            discount_amount = self.dex.stake(amount=amount, signer='stu')
+            
+            self.assertEqual(discount_amount, dex_quotes.calculate_discount(amount, state))
+            self.assertEqual(self.dex.discount['stu'], 1 - dex_quotes.calculate_discount(amount, state))
+        
     def test_stake_over_ninety_nine_percent_sets_discount_variable_at_ninety_nine(self): #TODO: fix to better adhere to PEP8
         print("This will fail with present numbers because there is not enough total supply")
         
@@ -1183,7 +1373,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
 
@@ -1196,7 +1386,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 + (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
         
     def test_buy_with_discount_updates_price(self):
         self.currency.transfer(amount=110, to='stu')
@@ -1211,7 +1401,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
@@ -1224,7 +1414,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 + (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
         
     def test_buy_with_discount_updates_reserves(self):
         self.currency.transfer(amount=110, to='stu')
@@ -1239,7 +1429,7 @@ class MyTestCase(TestCase):
         
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
@@ -1247,7 +1437,7 @@ class MyTestCase(TestCase):
         multiplier = 0.05
         fee = (1000 - 909.090909090909091) * (0.3 / 100) * 0.8 * (1 - accuracy * (100 ** (1 / accuracy) - 1) * multiplier)
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertEqual(cur_res, 110)
         self.assertAlmostEqual(Decimal(tok_res), Decimal(909.090909090909091) + Decimal(fee))
@@ -1265,7 +1455,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
 
@@ -1273,7 +1463,7 @@ class MyTestCase(TestCase):
         multiplier = 0.05
         fee = (1000 - 909.090909090909091) * (0.3 / 100) * 0.8 * 0.75 * (1 - accuracy * (100 ** (1 / accuracy) - 1) * multiplier)
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertEqual(cur_res, 110)
         self.assertAlmostEqual(Decimal(tok_res), Decimal(909.090909090909091 + fee), 3) #To account for slippage on the RSWP/TAU pair
@@ -1342,11 +1532,11 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
 
-        print(0.098029604940692 / self.dex.prices['con_token1'])
+        print(0.098029604940692 / self.dex.get_price(contract='con_token1'))
 
         # Because of fees, the amount left in the reserves differs
         expected_price = 0.098029604940692
@@ -1357,7 +1547,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 - (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
         
     def test_sell_with_token_fees_and_discount_updates_price(self):
         self.currency.transfer(amount=100, to='stu')
@@ -1372,11 +1562,11 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=10, token_fees=True, signer='stu')
 
-        print(0.098029604940692 / self.dex.prices['con_token1'])
+        print(0.098029604940692 / self.dex.get_price(contract='con_token1'))
 
         # Because of fees, the amount left in the reserves differs
         expected_price = 0.098029604940692
@@ -1387,7 +1577,7 @@ class MyTestCase(TestCase):
 
         actual_price = expected_price / (1 - (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
 
     def test_sell_with_discount_updates_reserves(self):
         self.currency.transfer(amount=100, to='stu')
@@ -1402,7 +1592,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
 
@@ -1410,7 +1600,7 @@ class MyTestCase(TestCase):
         multiplier = 0.05
         fee = (100 - 99.00990099009901) * (0.3 / 100) * 0.8 * (1 - accuracy * (100 ** (1 / accuracy) - 1) * multiplier)
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertAlmostEqual(Decimal(cur_res), Decimal(99.00990099009901) + Decimal(fee))
         self.assertEqual(tok_res, 1010)
@@ -1428,7 +1618,7 @@ class MyTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.sell(contract='con_token1', token_amount=10, token_fees=True, signer='stu')
 
@@ -1436,7 +1626,7 @@ class MyTestCase(TestCase):
         multiplier = 0.05
         fee = (100 - 99.00990099009901) * (0.3 / 100) * 0.8 * 0.75 * (1 - accuracy * (100 ** (1 / accuracy) - 1) * multiplier)
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertAlmostEqual(cur_res, Decimal(99.00990099009901) + Decimal(fee), 4)
         self.assertEqual(tok_res, Decimal(1010))
@@ -1456,20 +1646,35 @@ class MyTestCase(TestCase):
         for x in range(100):
             self.dex.buy(contract='con_token1', currency_amount=100, signer='stu')
             
-        self.assertAlmostEqual(Decimal(self.dex.reserves['con_token1'][0]), 10100)
-        self.assertAlmostEqual(self.token1.balances["stu"] + self.dex.reserves['con_token1'][1], 1000 - 1000 * Decimal(fee), 0)
+        self.assertAlmostEqual(Decimal(self.dex.markets['con_token1'][0]), 10100)
+        self.assertAlmostEqual(self.token1.balances["stu"] + self.dex.markets['con_token1'][1], 1000 - 1000 * Decimal(fee), 0)
             
     def test_change_state_works(self):
-        self.dex.change_state(key="DISCOUNT", new_value="0.1", convert_to_decimal=True)
-        self.assertEqual(self.dex.state['DISCOUNT'], 0.1)
+        self.dex.change_state(key="TOKEN_DISCOUNT", new_value="0.1", convert_to_decimal=True)
+        self.assertEqual(self.dex.state['TOKEN_DISCOUNT'], 0.1)
+        self.assertEqual(self.dex.settings.get()['TOKEN_DISCOUNT'], 0.1)
         
     def test_change_state_string_works(self):
         self.dex.change_state(key="BURN_ADDRESS", new_value="stu")
         self.assertEqual(self.dex.state['BURN_ADDRESS'], "stu")
         
     def test_change_state_int_works(self):
-        self.dex.change_state(key="DISCOUNT", new_value="1", convert_to_decimal=True)
-        self.assertEqual(self.dex.state['DISCOUNT'], 1)
+        self.dex.change_state(key="BURN_THRESHOLD", new_value="1", convert_to_decimal=True)
+        self.assertEqual(self.dex.state['BURN_THRESHOLD'], 1)
+
+    def test_change_state_invalid_key_fails(self):
+        with self.assertRaises(AssertionError):
+            self.dex.change_state(key="DISCOUNT", new_value="1", convert_to_decimal=True)
+
+    def test_settings_match_state(self):
+        self.dex.change_state(key="FEE_PERCENTAGE", new_value="0.01", convert_to_decimal=True)
+        self.dex.change_state(key="OWNER", new_value="stu")
+
+        settings = self.dex.settings.get()
+        for key in settings:
+            self.assertEqual(settings[key], self.dex.state[key])
+
+        self.assertNotIn("LOG_ACCURACY", settings)
         
     def test_change_owner_works(self):
         self.dex.change_state(key="OWNER", new_value="stu")
@@ -1500,7 +1705,7 @@ class MyTestCase(TestCase):
         
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.sell(contract='con_token1', token_amount=10)
 
@@ -1508,7 +1713,7 @@ class MyTestCase(TestCase):
         multiplier = 0.05
         fee = (100 - 99.00990099009901) * (0.3 / 100) * 0.6
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertAlmostEqual(cur_res, 99.00990099009901 + fee)
         
@@ -1614,6 +1819,50 @@ class MyTestCase(TestCase):
                 
         self.assertEquals(self.dex.discount['stu'], 1)
         
+    def test_token_change_resets_discount_on_next_trade(self):
+        self.currency.transfer(amount=110, to='stu')
+        self.amm.transfer(amount=100, to='stu')
+        self.currency.approve(amount=110, to='dex', signer='stu')
+        self.amm.approve(amount=100, to='dex', signer='stu')
+        
+        self.dex.stake(amount=100, signer='stu')
+        self.assertLess(self.dex.discount['stu'], 1)
+        
+        self.currency.approve(amount=100, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+        
+        self.dex.change_state(key="TOKEN_CONTRACT", new_value="con_token2")
+        self.assertEqual(self.dex.state['DISCOUNT_EPOCH'], 1)
+        self.assertLess(self.dex.discount['stu'], 1) #Nothing is rewritten by change_state
+        
+        quote = self.dex.get_buy_quote(contract='con_token1', currency_amount=10, account='stu')
+        self.assertLess(self.dex.discount['stu'], 1) #Quotes do not save the new discount
+        
+        tokens_purchased = self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
+        
+        self.assertEqual(tokens_purchased, quote['amount'])
+        self.assertEqual(self.dex.discount['stu'], 1)
+        self.assertEqual(self.dex.discount_epochs['stu'], 1)
+        
+    def test_multiplier_change_recalculates_discount_on_next_trade(self):
+        self.currency.transfer(amount=110, to='stu')
+        self.amm.transfer(amount=100, to='stu')
+        self.currency.approve(amount=110, to='dex', signer='stu')
+        self.amm.approve(amount=100, to='dex', signer='stu')
+        
+        self.dex.stake(amount=100, signer='stu')
+        
+        self.currency.approve(amount=100, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+        
+        self.dex.change_state(key="MULTIPLIER", new_value="0.1", convert_to_decimal=True)
+        self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
+        
+        state = {"MULTIPLIER": 0.1, "DISCOUNT_FLOOR": 0.0}
+        self.assertEqual(self.dex.discount['stu'], 1 - dex_quotes.calculate_discount(100, state))
+        
     def test_stake_arbitrary_token_after_token_change_does_not_affect_discount(self):
         return False #This test is no longer necessary
         
@@ -1768,7 +2017,7 @@ class RSWPTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
@@ -1779,7 +2028,7 @@ class RSWPTestCase(TestCase):
 
         actual_price = expected_price / (1 + (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
 
     def test_buy_sell_updates_price_to_original(self):
         self.currency.transfer(amount=110, to='stu')
@@ -1807,7 +2056,7 @@ class RSWPTestCase(TestCase):
 
         price_impact = 0.3 / (100 * 10)
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], 0.1 * (1 + price_impact * 2))
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), 0.1 * (1 + price_impact * 2))
 
     def test_buy_updates_reserves(self):
         self.currency.transfer(amount=110, to='stu')
@@ -1818,13 +2067,13 @@ class RSWPTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
 
         fee = (1000 - 909.090909090909091) * (0.3 / 100)
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertEqual(cur_res, 110)
         self.assertAlmostEqual(tok_res, 909.090909090909091 + fee)
@@ -1857,11 +2106,11 @@ class RSWPTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
 
         self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
 
-        print(0.098029604940692 / self.dex.prices['con_token1'])
+        print(0.098029604940692 / self.dex.get_price(contract='con_token1'))
 
         # Because of fees, the amount left in the reserves differs
         expected_price = 0.098029604940692
@@ -1870,7 +2119,7 @@ class RSWPTestCase(TestCase):
 
         actual_price = expected_price / (1 - (fee / amount))
 
-        self.assertAlmostEqual(self.dex.prices['con_token1'], actual_price)
+        self.assertAlmostEqual(self.dex.get_price(contract='con_token1'), actual_price)
 
     def test_sell_updates_reserves(self):
         self.currency.transfer(amount=100, to='stu')
@@ -1881,13 +2130,13 @@ class RSWPTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.reserves['con_token1'], [100, 1000])
+        self.assertEquals(self.dex.markets['con_token1'][:2], [100, 1000])
 
         self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
 
         fee = (100 - 99.00990099009901) * (0.3 / 100)
 
-        cur_res, tok_res = self.dex.reserves['con_token1']
+        cur_res, tok_res = self.dex.markets['con_token1'][:2]
 
         self.assertAlmostEqual(cur_res, 99.00990099009901 + fee)
         self.assertEqual(tok_res, 1010)
@@ -1972,10 +2221,59 @@ class SyncTestCase(TestCase):
         self.dex.change_state(key='SYNC_ENABLED', new_value=True)
         self.dex.sync_reserves(contract='con_token1', signer='stu')
         
-        tok_res = self.dex.reserves['con_token1'][1]
+        tok_res = self.dex.markets['con_token1'][1]
         
         self.assertEquals(tok_res, 200)
                 
+    def test_sync_many_updates_reserves(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=100)
+
+        self.token1.transfer(amount=100, to='dex')
+        self.amm.transfer(amount=50, to='dex')
+        
+        self.dex.change_state(key='SYNC_ENABLED', new_value=True)
+        balances = self.dex.sync_many(contracts=['con_token1', 'con_amm'], signer='stu')
+        
+        self.assertEqual(balances, [200, 1050])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 200])
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1050])
+        self.assertEqual(self.dex.get_price(contract='con_token1'), 0.5)
+        
+    def test_sync_many_leaves_out_staked_tokens(self):
+        self.amm.approve(amount=100, to='dex')
+        self.dex.stake(amount=100, token_contract='con_amm')
+        
+        self.dex.change_state(key='SYNC_ENABLED', new_value=True)
+        
+        self.assertEqual(self.dex.sync_many(contracts=['con_amm'], signer='stu'), [1000])
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1000])
+        
+        self.dex.stake(amount=0, token_contract='con_amm')
+        
+        self.assertEqual(self.dex.sync_many(contracts=['con_amm'], signer='stu'), [1000])
+        self.assertEqual(self.dex.staked_totals['con_amm'], 0)
+        
+    def test_sync_many_splits_unaccounted_currency(self):
+        self.currency.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=100)
+
+        self.currency.transfer(amount=110, to='dex')
+        
+        self.dex.change_state(key='SYNC_ENABLED', new_value=True)
+        self.dex.sync_many(contracts=['con_token1', 'con_amm', 'con_token1'], signer='stu')
+        
+        self.assertEqual(self.dex.markets['con_token1'][:2], [110, 100])
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1100, 1000])
+        
+    def test_sync_many_not_enabled_fails(self):
+        with self.assertRaises(AssertionError):
+            self.dex.sync_many(contracts=['con_token1'], signer="jeff")
+            
     def test_buy_works_after_sync(self):
         self.currency.approve(amount=1000, to='dex')
         self.token1.approve(amount=1000, to='dex')
@@ -2061,4 +2359,624 @@ class SyncTestCase(TestCase):
 
         self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000, signer='stu')
 
-        self.assertEquals(self.dex.prices['con_token1'], 0.1)
+        self.assertEquals(self.dex.get_price(contract='con_token1'), 0.1)
+
+
+class QuoteTestCase(TestCase):
+    def setUp(self):
+        self.client = ContractingClient()
+        self.client.flush()
+
+        with open('currency.c.py') as f:
+            contract = f.read()
+            self.client.submit(contract, 'currency')
+            self.client.submit(contract, 'con_token1')
+            self.client.submit(contract, 'con_amm')
+
+        self.client.submit(dex_contract.dex, 'dex')
+
+        self.dex = self.client.get_contract('dex')
+        self.amm = self.client.get_contract('con_amm')
+        self.currency = self.client.get_contract('currency')
+        self.token1 = self.client.get_contract('con_token1')
+
+        self.currency.approve(amount=1100, to='dex')
+        self.amm.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+
+        self.dex.create_market(contract='con_amm', currency_amount=1000, token_amount=1000)
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+
+        self.currency.transfer(amount=1000, to='stu')
+        self.token1.transfer(amount=1000, to='stu')
+        self.amm.transfer(amount=1000, to='stu')
+
+        self.currency.approve(amount=1000, to='dex', signer='stu')
+        self.token1.approve(amount=1000, to='dex', signer='stu')
+        self.amm.approve(amount=1000, to='dex', signer='stu')
+
+    def tearDown(self):
+        self.client.flush()
+
+    def snapshot(self):
+        reserves = {contract: self.dex.markets[contract][:2] for contract in ('con_amm', 'con_token1')}
+        state = {key: self.dex.state[key] for key in ('FEE_PERCENTAGE', 'TOKEN_CONTRACT', 'TOKEN_DISCOUNT', 'BURN_PERCENTAGE')}
+
+        return reserves, state
+
+    def assert_quote_matches(self, quote, result):
+        self.assertEqual(quote['amount'], result)
+
+        for contract in quote['reserves']:
+            self.assertEqual(quote['reserves'][contract], self.dex.markets[contract][:2])
+            self.assertEqual(quote['prices'][contract], self.dex.get_price(contract=contract))
+
+    def test_buy_quote_matches_contract(self):
+        reserves, state = self.snapshot()
+        quote = dex_quotes.buy(reserves, state, 'con_token1', 10)
+
+        self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=10, signer='stu'))
+
+    def test_buy_with_token_fees_quote_matches_contract(self):
+        reserves, state = self.snapshot()
+        quote = dex_quotes.buy(reserves, state, 'con_token1', 10, token_fees=True)
+
+        self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu'))
+        self.assertEqual(self.amm.balance_of(account='stu'), 1000 - quote['rswp_fee'])
+
+    def test_sell_quote_matches_contract(self):
+        reserves, state = self.snapshot()
+        quote = dex_quotes.sell(reserves, state, 'con_token1', 10)
+
+        self.assert_quote_matches(quote, self.dex.sell(contract='con_token1', token_amount=10, signer='stu'))
+
+    def test_sell_with_token_fees_quote_matches_contract(self):
+        reserves, state = self.snapshot()
+        quote = dex_quotes.sell(reserves, state, 'con_token1', 10, token_fees=True)
+
+        self.assert_quote_matches(quote, self.dex.sell(contract='con_token1', token_amount=10, token_fees=True, signer='stu'))
+        self.assertEqual(self.amm.balance_of(account='stu'), 1000 - quote['rswp_fee'])
+
+    def test_rswp_market_quotes_match_contract(self):
+        reserves, state = self.snapshot()
+        quote = dex_quotes.buy(reserves, state, 'con_amm', 10)
+
+        self.assert_quote_matches(quote, self.dex.buy(contract='con_amm', currency_amount=10, signer='stu'))
+
+        reserves, state = self.snapshot()
+        quote = dex_quotes.sell(reserves, state, 'con_amm', 10)
+
+        self.assert_quote_matches(quote, self.dex.sell(contract='con_amm', token_amount=10, signer='stu'))
+
+    def test_quotes_with_discount_match_contract(self):
+        self.dex.stake(amount=100, signer='stu')
+        discount = self.dex.discount['stu']
+
+        for token_fees in (False, True):
+            reserves, state = self.snapshot()
+            quote = dex_quotes.buy(reserves, state, 'con_token1', 10, discount=discount, token_fees=token_fees)
+
+            self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=10, token_fees=token_fees, signer='stu'))
+
+            reserves, state = self.snapshot()
+            quote = dex_quotes.sell(reserves, state, 'con_token1', 10, discount=discount, token_fees=token_fees)
+
+            self.assert_quote_matches(quote, self.dex.sell(contract='con_token1', token_amount=10, token_fees=token_fees, signer='stu'))
+
+    def test_quotes_match_contract_after_state_change(self):
+        self.dex.change_state(key="BURN_PERCENTAGE", new_value="0.6", convert_to_decimal=True)
+        self.dex.change_state(key="FEE_PERCENTAGE", new_value="0.01", convert_to_decimal=True)
+
+        reserves, state = self.snapshot()
+        quote = dex_quotes.buy(reserves, state, 'con_token1', 5.5)
+
+        self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=5.5, signer='stu'))
+
+        reserves, state = self.snapshot()
+        quote = dex_quotes.sell(reserves, state, 'con_token1', 12.25, token_fees=True)
+
+        self.assert_quote_matches(quote, self.dex.sell(contract='con_token1', token_amount=12.25, token_fees=True, signer='stu'))
+
+    def test_consecutive_quotes_match_contract(self):
+        for x in range(5):
+            reserves, state = self.snapshot()
+            quote = dex_quotes.buy(reserves, state, 'con_token1', 3, token_fees=x % 2 == 0)
+
+            self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=3, token_fees=x % 2 == 0, signer='stu'))
+
+    def test_token_fees_match_step_by_step_quotes(self):
+        #dex_quotes runs the token_fees legs as separate internal_sell/internal_buy steps
+        for amount in (0.01, 1, 7.5, 40, 250):
+            amm_balance = self.amm.balance_of(account='stu')
+            burned = self.amm.balance_of(account='0x0')
+
+            reserves, state = self.snapshot()
+            quote = dex_quotes.buy(reserves, state, 'con_token1', amount / 10, token_fees=True)
+
+            self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=amount / 10, token_fees=True, signer='stu'))
+
+            reserves, state = self.snapshot()
+            sell_quote = dex_quotes.sell(reserves, state, 'con_token1', amount, token_fees=True)
+
+            self.assert_quote_matches(sell_quote, self.dex.sell(contract='con_token1', token_amount=amount, token_fees=True, signer='stu'))
+
+            #Balances are stored to 30 decimal places after each trade, so the sums can differ in the last digits
+            self.assertAlmostEqual(self.amm.balance_of(account='stu'), amm_balance - quote['rswp_fee'] - sell_quote['rswp_fee'])
+            self.assertAlmostEqual(self.amm.balance_of(account='0x0'), burned + quote['burned'] + sell_quote['burned'])
+
+    def test_token_fees_without_burn_match_quotes(self):
+        self.dex.change_state(key="BURN_PERCENTAGE", new_value="0", convert_to_decimal=True)
+
+        reserves, state = self.snapshot()
+        quote = dex_quotes.buy(reserves, state, 'con_token1', 10, token_fees=True)
+
+        self.assert_quote_matches(quote, self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu'))
+        self.assertEqual(self.amm.balance_of(account='0x0'), quote['burned'])
+
+    def test_trades_add_burn_fees(self):
+        reserves, state = self.snapshot()
+        buy_quote = dex_quotes.buy(reserves, state, 'con_token1', 10)
+        self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
+
+        reserves, state = self.snapshot()
+        sell_quote = dex_quotes.sell(reserves, state, 'con_token1', 10)
+        self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
+
+        self.assertEqual(self.dex.burn_fees['con_token1'], [sell_quote['burn_fees']['con_token1'][0], buy_quote['burn_fees']['con_token1'][1]])
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1000])
+        self.assertEqual(self.amm.balance_of(account='0x0'), 0)
+
+    def test_flush_burns_matches_quote(self):
+        self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
+        self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
+        self.dex.change_state(key="BURN_THRESHOLD", new_value="0", convert_to_decimal=True)
+
+        reserves, state = self.snapshot()
+        state['BURN_THRESHOLD'] = 0
+        quote = dex_quotes.flush_burns(reserves, state, self.dex.burn_fees['con_token1'], 'con_token1')
+
+        self.assert_quote_matches(quote, self.dex.flush_burns(contract='con_token1', signer='jeff'))
+        self.assertEqual(self.amm.balance_of(account='0x0'), quote['burned'])
+        self.assertEqual(self.dex.burn_fees['con_token1'], [0, 0])
+
+        with self.assertRaises(AssertionError):
+            self.dex.flush_burns(contract='con_token1', signer='jeff')
+
+    def test_flush_burns_below_threshold_fails(self):
+        self.dex.buy(contract='con_token1', currency_amount=10, signer='stu')
+
+        with self.assertRaises(AssertionError):
+            self.dex.flush_burns(contract='con_token1', signer='jeff')
+
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1000])
+        self.assertEqual(self.amm.balance_of(account='0x0'), 0)
+
+    def test_quote_does_not_change_snapshot(self):
+        reserves, state = self.snapshot()
+        dex_quotes.buy(reserves, state, 'con_token1', 10, token_fees=True)
+
+        self.assertEqual(reserves['con_token1'], [100, 1000])
+        self.assertEqual(reserves['con_amm'], [1000, 1000])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
+
+    def test_quote_fails_if_no_market(self):
+        reserves, state = self.snapshot()
+
+        with self.assertRaises(AssertionError):
+            dex_quotes.buy(reserves, state, 'con_token2', 10)
+
+    def test_quote_fails_if_no_positive_value_provided(self):
+        reserves, state = self.snapshot()
+
+        with self.assertRaises(AssertionError):
+            dex_quotes.sell(reserves, state, 'con_token1', 0)
+
+    def test_get_buy_quote_matches_buy(self):
+        for token_fees in (False, True):
+            price = self.dex.get_price(contract='con_token1')
+            quote = self.dex.get_buy_quote(contract='con_token1', currency_amount=10, token_fees=token_fees, signer='stu')
+
+            self.assertEqual(quote['amount'], self.dex.buy(contract='con_token1', currency_amount=10, token_fees=token_fees, signer='stu'))
+            self.assertAlmostEqual(quote['price_impact'], self.dex.get_price(contract='con_token1') / price - 1)
+
+    def test_get_sell_quote_matches_sell(self):
+        for token_fees in (False, True):
+            price = self.dex.get_price(contract='con_token1')
+            quote = self.dex.get_sell_quote(contract='con_token1', token_amount=10, token_fees=token_fees, signer='stu')
+
+            self.assertEqual(quote['amount'], self.dex.sell(contract='con_token1', token_amount=10, token_fees=token_fees, signer='stu'))
+            self.assertAlmostEqual(quote['price_impact'], self.dex.get_price(contract='con_token1') / price - 1)
+
+    def test_get_quote_rswp_fee_matches_transfer(self):
+        quote = self.dex.get_buy_quote(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
+        self.dex.buy(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
+
+        self.assertEqual(self.amm.balance_of(account='stu'), 1000 - quote['rswp_fee'])
+
+    def test_get_quote_rswp_market_matches_trade(self):
+        quote = self.dex.get_buy_quote(contract='con_amm', currency_amount=10, signer='stu')
+        self.assertEqual(quote['amount'], self.dex.buy(contract='con_amm', currency_amount=10, signer='stu'))
+
+        quote = self.dex.get_sell_quote(contract='con_amm', token_amount=10, signer='stu')
+        self.assertEqual(quote['amount'], self.dex.sell(contract='con_amm', token_amount=10, signer='stu'))
+
+    def test_get_quote_uses_account_discount(self):
+        self.dex.stake(amount=100, signer='stu')
+
+        quote = self.dex.get_buy_quote(contract='con_token1', currency_amount=10, account='stu')
+        self.assertEqual(quote['amount'], self.dex.buy(contract='con_token1', currency_amount=10, signer='stu'))
+
+        quote = self.dex.get_sell_quote(contract='con_token1', token_amount=10, token_fees=True, account='stu')
+        self.assertEqual(quote['amount'], self.dex.sell(contract='con_token1', token_amount=10, token_fees=True, signer='stu'))
+
+    def test_get_quote_does_not_write(self):
+        self.dex.get_buy_quote(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
+        self.dex.get_sell_quote(contract='con_token1', token_amount=10, signer='stu')
+
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1000])
+        self.assertEqual(self.currency.balance_of(account='stu'), 1000)
+        self.assertEqual(self.amm.balance_of(account='stu'), 1000)
+
+    def test_get_quote_fails_if_no_market(self):
+        with self.assertRaises(AssertionError):
+            self.dex.get_buy_quote(contract='con_token2', currency_amount=10)
+
+        with self.assertRaises(AssertionError):
+            self.dex.get_sell_quote(contract='con_token2', token_amount=10)
+
+    def test_get_quote_fails_if_no_rswp_market(self):
+        self.dex.change_state(key="TOKEN_CONTRACT", new_value="con_token2")
+
+        with self.assertRaises(AssertionError):
+            self.dex.get_buy_quote(contract='con_token1', currency_amount=10, token_fees=True, signer='stu')
+
+        with self.assertRaises(AssertionError):
+            self.dex.get_sell_quote(contract='con_token1', token_amount=10, token_fees=True, signer='stu')
+
+class SwapTestCase(TestCase):
+    def setUp(self):
+        self.client = ContractingClient()
+        self.client.flush()
+
+        with open('currency.c.py') as f:
+            contract = f.read()
+            self.client.submit(contract, 'currency')
+            self.client.submit(contract, 'con_token1')
+            self.client.submit(contract, 'con_token2')
+            self.client.submit(contract, 'con_amm')
+
+        self.client.submit(dex_contract.dex, 'dex')
+
+        self.dex = self.client.get_contract('dex')
+        self.amm = self.client.get_contract('con_amm')
+        self.currency = self.client.get_contract('currency')
+        self.token1 = self.client.get_contract('con_token1')
+        self.token2 = self.client.get_contract('con_token2')
+
+        self.currency.approve(amount=1600, to='dex')
+        self.amm.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+        self.token2.approve(amount=200, to='dex')
+
+        self.dex.create_market(contract='con_amm', currency_amount=1000, token_amount=1000)
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+        self.dex.create_market(contract='con_token2', currency_amount=500, token_amount=200)
+
+        self.currency.transfer(amount=1000, to='stu')
+        self.token1.transfer(amount=1000, to='stu')
+        self.amm.transfer(amount=1000, to='stu')
+
+        self.currency.approve(amount=1000, to='dex', signer='stu')
+        self.token1.approve(amount=1000, to='dex', signer='stu')
+        self.amm.approve(amount=1000, to='dex', signer='stu')
+
+    def tearDown(self):
+        self.client.flush()
+
+    def snapshot(self):
+        reserves = {contract: self.dex.markets[contract][:2] for contract in ('con_amm', 'con_token1', 'con_token2')}
+        state = {key: self.dex.state[key] for key in ('FEE_PERCENTAGE', 'TOKEN_CONTRACT', 'TOKEN_DISCOUNT', 'BURN_PERCENTAGE')}
+
+        return reserves, state
+
+    def test_swap_works(self):
+        self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token2', amount=10, signer='stu')
+
+    def test_swap_matches_sell_then_buy(self):
+        reserves, state = self.snapshot()
+
+        currency_purchased = self.dex.sell(contract='con_token1', token_amount=10, signer='stu')
+        tokens_purchased = self.dex.buy(contract='con_token2', currency_amount=currency_purchased, signer='stu')
+
+        self.assertEqual(dex_quotes.swap_tokens(reserves, state, 'con_token1', 'con_token2', 10)['amount'], tokens_purchased)
+
+    def test_swap_quote_matches_contract(self):
+        for token_fees in (False, True):
+            reserves, state = self.snapshot()
+            amm_balance = self.amm.balance_of(account='stu')
+
+            quote = dex_quotes.swap_tokens(reserves, state, 'con_token1', 'con_token2', 10, token_fees=token_fees)
+            result = self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token2', amount=10, token_fees=token_fees, signer='stu')
+
+            self.assertEqual(quote['amount'], result)
+            self.assertEqual(self.amm.balance_of(account='stu'), amm_balance - quote['rswp_fee'])
+
+            for contract in quote['reserves']:
+                self.assertEqual(quote['reserves'][contract], self.dex.markets[contract][:2])
+                self.assertEqual(quote['prices'][contract], self.dex.get_price(contract=contract))
+
+    def test_swap_with_rswp_matches_quote(self):
+        reserves, state = self.snapshot()
+        quote = dex_quotes.swap_tokens(reserves, state, 'con_amm', 'con_token1', 10)
+
+        self.assertEqual(quote['amount'], self.dex.swap_tokens(from_contract='con_amm', to_contract='con_token1', amount=10, signer='stu'))
+
+        reserves, state = self.snapshot()
+        quote = dex_quotes.swap_tokens(reserves, state, 'con_token1', 'con_amm', 10)
+
+        self.assertEqual(quote['amount'], self.dex.swap_tokens(from_contract='con_token1', to_contract='con_amm', amount=10, signer='stu'))
+
+    def test_swap_transfers_correct_amount_of_tokens(self):
+        tokens_purchased = self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token2', amount=10, signer='stu')
+
+        self.assertEqual(self.token1.balance_of(account='stu'), 990)
+        self.assertEqual(self.token2.balance_of(account='stu'), tokens_purchased)
+        self.assertEqual(self.currency.balance_of(account='stu'), 1000)
+
+    def test_swap_fails_if_less_than_minimum_received(self):
+        with self.assertRaises(AssertionError):
+            self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token2', amount=10, minimum_received=1, signer='stu')
+
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
+        self.assertEqual(self.dex.markets['con_token2'][:2], [500, 200])
+        self.assertEqual(self.token1.balance_of(account='stu'), 1000)
+        self.assertEqual(self.token2.balance_of(account='stu'), 0)
+
+    def test_swap_with_token_fees_fails_if_less_than_minimum_received(self):
+        with self.assertRaises(AssertionError):
+            self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token2', amount=10, minimum_received=1, token_fees=True, signer='stu')
+
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1000])
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
+        self.assertEqual(self.dex.markets['con_token2'][:2], [500, 200])
+
+    def test_swap_fails_if_same_token(self):
+        with self.assertRaises(AssertionError):
+            self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token1', amount=10, signer='stu')
+
+    def test_swap_fails_if_no_market(self):
+        with self.assertRaises(AssertionError):
+            self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token3', amount=10, signer='stu')
+
+    def test_swap_fails_if_no_positive_value_provided(self):
+        with self.assertRaises(AssertionError):
+            self.dex.swap_tokens(from_contract='con_token1', to_contract='con_token2', amount=0, signer='stu')
+
+class BatchTradeTestCase(TestCase):
+    def setUp(self):
+        self.client = ContractingClient()
+        self.client.flush()
+
+        with open('currency.c.py') as f:
+            contract = f.read()
+            self.client.submit(contract, 'currency')
+            self.client.submit(contract, 'con_token1')
+            self.client.submit(contract, 'con_token2')
+            self.client.submit(contract, 'con_amm')
+
+        self.client.submit(dex_contract.dex, 'dex')
+
+        self.dex = self.client.get_contract('dex')
+        self.amm = self.client.get_contract('con_amm')
+        self.currency = self.client.get_contract('currency')
+        self.token1 = self.client.get_contract('con_token1')
+        self.token2 = self.client.get_contract('con_token2')
+
+        self.currency.approve(amount=1600, to='dex')
+        self.amm.approve(amount=1000, to='dex')
+        self.token1.approve(amount=1000, to='dex')
+        self.token2.approve(amount=200, to='dex')
+
+        self.dex.create_market(contract='con_amm', currency_amount=1000, token_amount=1000)
+        self.dex.create_market(contract='con_token1', currency_amount=100, token_amount=1000)
+        self.dex.create_market(contract='con_token2', currency_amount=500, token_amount=200)
+
+        self.currency.transfer(amount=1000, to='stu')
+        self.token1.transfer(amount=1000, to='stu')
+        self.token2.transfer(amount=100, to='stu')
+        self.amm.transfer(amount=1000, to='stu')
+
+        self.currency.approve(amount=1000, to='dex', signer='stu')
+        self.token1.approve(amount=1000, to='dex', signer='stu')
+        self.token2.approve(amount=100, to='dex', signer='stu')
+        self.amm.approve(amount=1000, to='dex', signer='stu')
+
+        self.orders = [
+            {'contract': 'con_token1', 'side': 'buy', 'amount': 10},
+            {'contract': 'con_token1', 'side': 'sell', 'amount': 50, 'token_fees': True},
+            {'contract': 'con_token2', 'side': 'sell', 'amount': 5},
+            {'contract': 'con_amm', 'side': 'buy', 'amount': 20},
+            {'contract': 'con_token2', 'side': 'buy', 'amount': 15, 'token_fees': True}
+        ]
+
+    def tearDown(self):
+        self.client.flush()
+
+    def quote_orders(self, orders):
+        reserves = {contract: self.dex.markets[contract][:2] for contract in ('con_amm', 'con_token1', 'con_token2')}
+        state = {key: self.dex.state[key] for key in ('FEE_PERCENTAGE', 'TOKEN_CONTRACT', 'TOKEN_DISCOUNT', 'BURN_PERCENTAGE')}
+
+        quotes = []
+        for order in orders:
+            quote = (dex_quotes.buy if order['side'] == 'buy' else dex_quotes.sell)(reserves, state, order['contract'], order['amount'], token_fees=order.get('token_fees', False))
+            reserves.update(quote['reserves'])
+            quotes.append(quote)
+
+        return quotes, reserves
+
+    def test_batch_trade_matches_sequential_trades(self):
+        quotes, reserves = self.quote_orders(self.orders)
+
+        self.assertEqual(self.dex.batch_trade(orders=self.orders, signer='stu'), [quote['amount'] for quote in quotes])
+
+        for contract in reserves:
+            self.assertEqual(self.dex.markets[contract][:2], reserves[contract])
+
+    def test_batch_trade_nets_transfers(self):
+        quotes, reserves = self.quote_orders(self.orders)
+        self.dex.batch_trade(orders=self.orders, signer='stu')
+
+        self.assertEqual(self.currency.balance_of(account='stu'), 1000 - 10 + quotes[1]['amount'] + quotes[2]['amount'] - 20 - 15)
+        self.assertEqual(self.token1.balance_of(account='stu'), 1000 + quotes[0]['amount'] - 50)
+        self.assertEqual(self.token2.balance_of(account='stu'), 100 - 5 + quotes[4]['amount'])
+        self.assertEqual(self.amm.balance_of(account='stu'), 1000 + (-quotes[1]['rswp_fee'] + quotes[3]['amount'] - quotes[4]['rswp_fee'])) #The RSWP legs are netted in order before the transfer
+        self.assertEqual(self.amm.balance_of(account='0x0'), sum(quote['burned'] for quote in quotes))
+
+    def test_batch_trade_single_order_matches_buy(self):
+        order = {'contract': 'con_token1', 'side': 'buy', 'amount': 10, 'minimum_received': 1}
+        quotes, reserves = self.quote_orders([order])
+
+        self.assertEqual(self.dex.batch_trade(orders=[order], signer='stu'), [quotes[0]['amount']])
+        self.assertEqual(self.token1.balance_of(account='stu'), 1000 + quotes[0]['amount'])
+
+    def test_batch_trade_fails_if_less_than_minimum_received(self):
+        orders = self.orders[:2] + [{'contract': 'con_token2', 'side': 'sell', 'amount': 5, 'minimum_received': 100}]
+
+        with self.assertRaises(AssertionError):
+            self.dex.batch_trade(orders=orders, signer='stu')
+
+        self.assertEqual(self.dex.markets['con_token1'][:2], [100, 1000])
+        self.assertEqual(self.dex.markets['con_amm'][:2], [1000, 1000])
+        self.assertEqual(self.token1.balance_of(account='stu'), 1000)
+
+    def test_batch_trade_fails_if_invalid_order(self):
+        with self.assertRaises(AssertionError):
+            self.dex.batch_trade(orders=[], signer='stu')
+
+        with self.assertRaises(AssertionError):
+            self.dex.batch_trade(orders=[{'contract': 'con_token1', 'side': 'swap', 'amount': 10}], signer='stu')
+
+        with self.assertRaises(AssertionError):
+            self.dex.batch_trade(orders=[{'contract': 'con_token3', 'side': 'buy', 'amount': 10}], signer='stu')
+
+        with self.assertRaises(AssertionError):
+            self.dex.batch_trade(orders=[{'contract': 'con_token1', 'side': 'buy', 'amount': 0}], signer='stu')
+
+class BatchQuoteTestCase(TestCase):
+    def setUp(self):
+        self.state = {'FEE_PERCENTAGE': 0.003, 'TOKEN_CONTRACT': 'con_amm', 'TOKEN_DISCOUNT': 0.75, 'BURN_PERCENTAGE': 0.8}
+        self.reserves = {'con_amm': [1000, 1000], 'con_token1': [100, 1000]}
+
+    def assert_batch_matches(self, is_buy, amounts, discount=1, token_fees=False, contract='con_token1'):
+        currency_reserve, token_reserve = self.reserves[contract]
+        result = batch_quotes.batch_quote(currency_reserve, token_reserve, amounts, self.state, self.reserves['con_amm'], is_buy=is_buy,
+                                          discounts=discount, token_fees=token_fees, is_rswp=contract == 'con_amm')
+
+        for x, amount in enumerate(amounts):
+            quote = (dex_quotes.buy if is_buy else dex_quotes.sell)(self.reserves, self.state, contract, amount, discount=discount, token_fees=token_fees)
+
+            self.assertAlmostEqual(result['amount'][x], float(quote['amount']))
+            self.assertAlmostEqual(result['currency_reserve'][x], float(quote['reserves'][contract][0]))
+            self.assertAlmostEqual(result['token_reserve'][x], float(quote['reserves'][contract][1]))
+            self.assertAlmostEqual(result['price'][x], float(quote['prices'][contract]))
+            self.assertAlmostEqual(result['rswp_fee'][x], float(quote['rswp_fee']))
+
+    def test_batch_buy_matches_scalar_quotes(self):
+        self.assert_batch_matches(True, [0.001, 1, 10, 55.5])
+
+    def test_batch_buy_with_token_fees_and_discount_matches_scalar_quotes(self):
+        self.assert_batch_matches(True, [0.001, 1, 10, 55.5], discount=0.7, token_fees=True)
+
+    def test_batch_sell_matches_scalar_quotes(self):
+        self.assert_batch_matches(False, [0.01, 10, 100, 555])
+
+    def test_batch_sell_with_token_fees_and_discount_matches_scalar_quotes(self):
+        self.assert_batch_matches(False, [0.01, 10, 100, 555], discount=0.7, token_fees=True)
+
+    def test_batch_rswp_market_matches_scalar_quotes(self):
+        self.assert_batch_matches(True, [1, 10, 100], contract='con_amm')
+        self.assert_batch_matches(False, [1, 10, 100], contract='con_amm')
+
+    def test_batch_mixed_markets_and_sides(self):
+        result = batch_quotes.batch_quote([100, 1000], [1000, 1000], [10, 10], self.state, self.reserves['con_amm'], is_buy=[True, False],
+                                          token_fees=[False, True], is_rswp=[False, True])
+
+        self.assertAlmostEqual(result['amount'][0], float(dex_quotes.buy(self.reserves, self.state, 'con_token1', 10)['amount']))
+        self.assertAlmostEqual(result['amount'][1], float(dex_quotes.sell(self.reserves, self.state, 'con_amm', 10, token_fees=True)['amount']))
+
+    def test_batch_price_impact(self):
+        result = batch_quotes.batch_quote(100, 1000, [10, 20], self.state, self.reserves['con_amm'])
+
+        self.assertAlmostEqual(result['price_impact'][0], result['price'][0] / 0.1 - 1)
+        self.assertTrue(result['price_impact'][1] > result['price_impact'][0])
+
+    def test_batch_fails_if_no_positive_value_provided(self):
+        with self.assertRaises(AssertionError):
+            batch_quotes.batch_quote(100, 1000, [10, 0], self.state, self.reserves['con_amm'])
+
+class RouteFinderTestCase(TestCase):
+    def setUp(self):
+        self.state = {'FEE_PERCENTAGE': 0.003, 'TOKEN_CONTRACT': 'con_amm', 'TOKEN_DISCOUNT': 0.75, 'BURN_PERCENTAGE': 0.8}
+        self.reserves = {'con_amm': [1000, 1000], 'con_token1': [100, 1000], 'con_token2': [500, 200]}
+
+        self.finder = route_finder.RouteFinder()
+        self.finder.load_dex(self.reserves, self.state, discount=0.9)
+
+    def test_route_matches_scalar_quotes(self):
+        route = self.finder.find_route('con_token1', 'con_token2', 10, parts=1)
+        quote = dex_quotes.swap_tokens(self.reserves, self.state, 'con_token1', 'con_token2', 10, discount=0.9)
+
+        self.assertEqual(route['routes'][0]['path'], ('con_token1', 'currency', 'con_token2'))
+        self.assertAlmostEqual(route['amount'], float(quote['amount']))
+
+        route = self.finder.find_route('currency', 'con_token1', 10)
+        self.assertAlmostEqual(route['amount'], float(dex_quotes.buy(self.reserves, self.state, 'con_token1', 10, discount=0.9)['amount']))
+
+        route = self.finder.find_route('con_amm', 'currency', 10)
+        self.assertAlmostEqual(route['amount'], float(dex_quotes.sell(self.reserves, self.state, 'con_amm', 10, discount=0.9)['amount']))
+
+    def test_route_uses_deepest_market(self):
+        self.finder.load_pairs({('currency', 'con_token1'): (10000, 100000)})
+        route = self.finder.find_route('currency', 'con_token1', 10, parts=1)
+
+        self.assertEqual(route['routes'][0]['pools'], (('pairs', 'currency', 'con_token1'),))
+
+        #dex_pairs takes the fee from the input
+        self.assertAlmostEqual(route['amount'], 10 * 0.997 * 100000 / (10000 + 10 * 0.997))
+
+    def test_route_follows_reserve_updates(self):
+        self.finder.load_pairs({('con_amm', 'con_token2'): (1000, 400)})
+        self.assertEqual(self.finder.find_route('con_amm', 'con_token2', 1, parts=1)['routes'][0]['pools'], (('pairs', 'con_amm', 'con_token2'),))
+
+        self.finder.update_pair('con_amm', 'con_token2', 1000, 10)
+        self.assertEqual(self.finder.find_route('con_amm', 'con_token2', 1, parts=1)['routes'][0]['path'], ('con_amm', 'currency', 'con_token2'))
+
+    def test_route_splits_large_trades(self):
+        self.finder.load_pairs({('currency', 'con_token2'): (500, 200)})
+        single = self.finder.find_route('con_token1', 'con_token2', 50, parts=1)
+        split = self.finder.find_route('con_token1', 'con_token2', 50)
+
+        self.assertEqual(len(split['routes']), 2)
+        self.assertTrue(split['amount'] > single['amount'])
+        self.assertAlmostEqual(sum(route['amount_in'] for route in split['routes']), 50)
+        self.assertAlmostEqual(sum(route['amount'] for route in split['routes']), split['amount'])
+
+    def test_route_respects_max_hops(self):
+        self.finder.load_pairs({('con_token2', 'con_token3'): (100, 100)})
+        self.assertEqual(len(self.finder.get_paths('con_token1', 'con_token3')), 1)
+
+        self.finder.max_hops = 2
+        self.finder.paths = {}
+
+        with self.assertRaises(AssertionError):
+            self.finder.find_route('con_token1', 'con_token3', 10)
+
+    def test_route_fails_if_no_route(self):
+        with self.assertRaises(AssertionError):
+            self.finder.find_route('con_token1', 'con_token4', 10)
+
+        self.finder.remove_pool(('dex', 'con_token2'))
+
+        with self.assertRaises(AssertionError):
+            self.finder.find_route('con_token1', 'con_token2', 10)
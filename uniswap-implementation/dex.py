@@ -20,6 +20,13 @@ pair_token_interface = [
     I.Func('balance_of', args=('account',))
 ]
 
+# The first token of a routed path is pulled from the caller
+router_token_interface = [
+    I.Func('transfer', args=('amount', 'to')),
+    I.Func('transfer_from', args=('amount', 'from_address', 'to_address')),
+    I.Func('balance_of', args=('account',))
+]
+
 dex_pairs_interface = [
     I.Func('get_length_pairs', args=())
 ]
@@ -57,6 +64,87 @@ def quote(a_amount, a_reserve, b_reserve):
 
     return b_amount
 
+# UniswapV2Library.sol => getAmountOut
+# given an input amount of an asset and pair reserves, returns the maximum output amount of the other asset
+def get_amount_out(amount_in, reserve_in, reserve_out):
+    assert amount_in > 0, 'Insufficient input amount!'
+    assert reserve_in > 0 and reserve_out > 0, 'Insufficient liquidity'
+    amount_in_with_fee = amount_in * 997
+    numerator = amount_in_with_fee * reserve_out
+    denominator = reserve_in * 1000 + amount_in_with_fee
+
+    return numerator / denominator
+
+# UniswapV2Library.sol => getAmountIn
+# given an output amount of an asset and pair reserves, returns a required input amount of the other asset
+# No +1 rounding like the solidity version, amounts are decimals and not integers
+def get_amount_in(amount_out, reserve_in, reserve_out):
+    assert amount_out > 0, 'Insufficient output amount!'
+    assert reserve_in > 0 and reserve_out > amount_out, 'Insufficient liquidity'
+    numerator = reserve_in * amount_out * 1000
+    denominator = (reserve_out - amount_out) * 997
+
+    return numerator / denominator
+
+# UniswapV2Library.sol => getReserves
+# Pairs are stored as [tau_contract, token_contract], so the lookup is tried both ways
+def get_reserves(pairs, a_contract, b_contract):
+    if pairs.pair(tau_contract=a_contract, token_contract=b_contract) is not None:
+        a_reserve, b_reserve = pairs.get_pair_reserves(tau_contract=a_contract, token_contract=b_contract)
+    else:
+        assert pairs.pair(tau_contract=b_contract, token_contract=a_contract) is not None, 'Market does not exist!'
+        b_reserve, a_reserve = pairs.get_pair_reserves(tau_contract=b_contract, token_contract=a_contract)
+
+    return a_reserve, b_reserve
+
+# UniswapV2Library.sol => getAmountsOut
+def get_path_amounts_out(pairs, amount_in, path):
+    assert len(path) >= 2, 'Invalid path!'
+    amounts = [amount_in]
+    for i in range(len(path) - 1):
+        reserve_in, reserve_out = get_reserves(pairs, path[i], path[i + 1])
+        amounts.append(get_amount_out(amounts[i], reserve_in, reserve_out))
+
+    return amounts
+
+# UniswapV2Library.sol => getAmountsIn
+def get_path_amounts_in(pairs, amount_out, path):
+    assert len(path) >= 2, 'Invalid path!'
+    amounts = [amount_out]
+    for i in range(len(path) - 1, 0, -1):
+        reserve_in, reserve_out = get_reserves(pairs, path[i - 1], path[i])
+        amounts.insert(0, get_amount_in(amounts[0], reserve_in, reserve_out))
+
+    return amounts
+
+# UniswapV2Router02.sol => _swap
+# dex_pairs accounts for inputs by balance deltas, so every hop but the last pays out to this contract, which then
+# forwards the tokens back to dex_pairs as the input of the next hop
+def swap_path(pairs, dex_pairs, amounts, path, to):
+    token_in = I.import_module(path[0])
+    assert I.enforce_interface(token_in, router_token_interface), 'Token contract does not meet the required interface'
+    token_in.transfer_from(amount=amounts[0], from_address=ctx.caller, to_address=dex_pairs)
+
+    for i in range(len(path) - 1):
+        a_contract = path[i]
+        b_contract = path[i + 1]
+        last_hop = i == len(path) - 2
+
+        if last_hop:
+            recipient = to
+        else:
+            recipient = ctx.this
+
+        if pairs.pair(tau_contract=a_contract, token_contract=b_contract) is not None:
+            pairs.swap(tau_contract=a_contract, token_contract=b_contract, tau_out=0, token_out=amounts[i + 1], to_address=recipient)
+        else:
+            pairs.swap(tau_contract=b_contract, token_contract=a_contract, tau_out=amounts[i + 1], token_out=0, to_address=recipient)
+
+        if not last_hop:
+            token_out = I.import_module(b_contract)
+            assert I.enforce_interface(token_out, pair_token_interface), 'Token contract does not meet the required interface'
+            token_out.transfer(amount=amounts[i + 1], to=dex_pairs)
+
 @construct
 def seed(fee_to_setter_address:str):
     fee_to.set(zero_address())
@@ -141,3 +229,41 @@ def add_liquidity(dex_pairs: str, tau_contract: str, token_contract: str, tau_in
         pairs[tau.token_name(), token.token_name(), 'tau_reserve'],
         pairs[tau.token_name(), token.token_name(), 'token_reserve']
     )
+
+@export
+# Router02 Fn - quotes every hop of path for an exact input
+def get_amounts_out(dex_pairs: str, amount_in: float, path: list):
+    pairs = get_dex_pairs_interface(dex_pairs)
+    return get_path_amounts_out(pairs, amount_in, path)
+
+@export
+# Router02 Fn - quotes every hop of path for an exact output
+def get_amounts_in(dex_pairs: str, amount_out: float, path: list):
+    pairs = get_dex_pairs_interface(dex_pairs)
+    return get_path_amounts_in(pairs, amount_out, path)
+
+# Router02 Fn
+# Swaps an exact amount of path[0] for as much of path[-1] as possible, all hops in one transaction
+@export
+def swap_exact_tokens_for_tokens(dex_pairs: str, amount_in: float, amount_out_min: float, path: list, to: str):
+    pairs = get_dex_pairs_interface(dex_pairs)
+
+    amounts = get_path_amounts_out(pairs, amount_in, path)
+    assert amounts[-1] >= amount_out_min, 'Insufficient output amount!'
+
+    swap_path(pairs, dex_pairs, amounts, path, to)
+
+    return amounts
+
+# Router02 Fn
+# Swaps as little of path[0] as possible for an exact amount of path[-1], all hops in one transaction
+@export
+def swap_tokens_for_exact_tokens(dex_pairs: str, amount_out: float, amount_in_max: float, path: list, to: str):
+    pairs = get_dex_pairs_interface(dex_pairs)
+
+    amounts = get_path_amounts_in(pairs, amount_out, path)
+    assert amounts[0] <= amount_in_max, 'Excessive input amount!'
+
+    swap_path(pairs, dex_pairs, amounts, path, to)
+
+    return amounts
@@ -55,6 +55,11 @@ def get_dex_interface(dex_contract):
 
     return dex
 
+# Reserves for use inside this contract. Calling the get_pair_reserves export from here would pop the caller
+# context when it returns, and tokens sent afterwards would come from the contract that called this one
+def read_pair_reserves(tau_contract, token_contract):
+    return pairs[tau_contract, token_contract, 'tau_reserve'], pairs[tau_contract, token_contract, 'token_reserve']
+
 # Get token modules, validate & return
 def get_token_interface(tau_contract, token_contract):
     # Make sure that what is imported is actually a valid token
@@ -217,8 +222,25 @@ def pair_address(tau_contract:str, token_contract:str):
 @export
 # Returns the total reserves from each tau/token
 def get_pair_reserves(tau_contract:str, token_contract:str):
-    return pairs[tau_contract, token_contract, 'tau_reserve'], \
-            pairs[tau_contract, token_contract, 'token_reserve']
+    return read_pair_reserves(tau_contract, token_contract)
+
+@export
+# Returns the reserves, LP token supply and the account's LP token balance of each [tau_contract, token_contract] in pair_list
+def get_pairs_reserves(pair_list:list, account:str=None):
+    if account is None:
+        account = ctx.caller
+
+    result = []
+    for tau_contract, token_contract in pair_list:
+        assert not pairs[tau_contract, token_contract] is None, 'Invalid pair'
+        result.append({
+            'tau_reserve': pairs[tau_contract, token_contract, 'tau_reserve'],
+            'token_reserve': pairs[tau_contract, token_contract, 'token_reserve'],
+            'lp_token_supply': pairs[tau_contract, token_contract, 'lp_token_supply'],
+            'lp_token_balance': pairs[tau_contract, token_contract, 'lp_token_balance', account]
+        })
+
+    return result
 
 @export
 def balance_of(tau_contract:str, token_contract:str, account:str):
@@ -257,7 +279,7 @@ def mint_liquidity(dex_contract:str, tau_contract:str, token_contract: str, to_a
     assert not dex is None, 'Dex needs to be valid'
 
     # 1 - Last pair reserves
-    tau_reserve, token_reserve = get_pair_reserves(tau_contract=tau_contract,token_contract=token_contract) # "gas savings"
+    tau_reserve, token_reserve = read_pair_reserves(tau_contract, token_contract) # "gas savings"
 
     # 2 - Last total balances
     last_total_tau_balance = pairs[tau_contract, 'balance']
@@ -324,7 +346,7 @@ def burn_liquidity(dex_contract: str, tau_contract: str, token_contract: str, to
     dex = get_dex_interface(dex_contract)
     assert not dex is None, 'Dex needs to be valid'
 
-    tau_reserve, token_reserve = get_pair_reserves(tau_contract=tau_contract,token_contract=token_contract) # "gas savings"
+    tau_reserve, token_reserve = read_pair_reserves(tau_contract, token_contract) # "gas savings"
 
     # 2 - Get Pair's balance
     last_total_tau_balance = pairs[tau_contract, 'balance']
@@ -380,10 +402,7 @@ def swap(tau_contract:str,  token_contract:str, tau_out:float, token_out:float,
     tau, token = get_token_interface(tau_contract, token_contract)
     assert tau_contract != token_contract
 
-    tau_reserve, token_reserve = get_pair_reserves(
-        tau_contract=tau_contract,
-        token_contract=token_contract
-    )
+    tau_reserve, token_reserve = read_pair_reserves(tau_contract, token_contract)
     assert tau_reserve > tau_out and token_reserve > token_out, 'UniswapV2: Insuficient Liquidity and Reserves'
 
     # optimistic transfer...
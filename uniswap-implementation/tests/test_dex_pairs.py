@@ -126,6 +126,18 @@ class DexPairsSpecs(TestCase):
         assert tau_reserves == tau_amount, 'Invalid tau reserves'
         assert token_reserves == eth_amount, 'Invalid eth reserves'
 
+        pair_state = self.dex_pairs.get_pairs_reserves(
+            pair_list=[[self.tau.name, self.eth.name]],
+            account=self.wallet_address
+        )
+
+        assert pair_state == [{
+            'tau_reserve': tau_reserves,
+            'token_reserve': token_reserves,
+            'lp_token_supply': total_supply,
+            'lp_token_balance': wallet_address_balance
+        }], 'Invalid pairs reserves'
+
     def add_liquidity(self, tau_amount, token_amount):
         self.tau.transfer(amount=tau_amount, to=self.dex_pairs.name)
         self.eth.transfer(amount=token_amount, to=self.dex_pairs.name)
@@ -494,3 +506,217 @@ class DexPairsSpecs(TestCase):
         token_balance = self.eth.balance_of(account=self.dex_pairs.name)
         expected_token_balance = self.expand_to_token_decimals(250000187312969 + MINIMUM_LIQUIDITY)
         self.assertAlmostEqual(token_balance, expected_token_balance, places=17)
+
+# All test values for single hop tests, taken from UniswapV2Router02.spec.ts
+class DexRouterSpecs(TestCase):
+
+    # returns ContractingDecimal
+    def expand_to_token_decimals(self, amount):
+        return ContractingDecimal(amount / pow(10,TOKEN_DECIMALS))
+
+    # before each test, setup the conditions
+    def setUp(self):
+        self.client = ContractingClient()
+        self.client.flush()
+
+        self.fee_to_setter_address = 'fee_to_setter_address'
+        self.wallet_address = 'wallet_address'
+
+        with open('../currency.py') as f:
+            code = f.read()
+            self.client.submit(code, 'tau', constructor_args={
+                's_name': 'tau',
+                's_symbol': 'TAU',
+                'vk': self.wallet_address,
+                'vk_amount': STARTING_BALANCE
+            })
+
+        with open('../basetoken.py') as f:
+            code = f.read()
+            self.client.submit(code, name='eth', constructor_args={
+                's_name': 'eth',
+                's_symbol': 'ETH',
+                'vk': self.wallet_address,
+                'vk_amount': STARTING_BALANCE
+            })
+            self.client.submit(code, name='btc', constructor_args={
+                's_name': 'btc',
+                's_symbol': 'BTC',
+                'vk': self.wallet_address,
+                'vk_amount': STARTING_BALANCE
+            })
+
+        with open('../dex.py') as f:
+            code = f.read()
+            self.client.submit(code, 'dex', constructor_args={
+                'fee_to_setter_address': self.fee_to_setter_address
+            })
+
+        with open('../dex_pairs.py') as f:
+            code = f.read()
+            self.client.submit(code, 'dex_pairs', constructor_args={
+                'owner_address': 'dex'
+            })
+
+        self.client.signer = self.wallet_address
+
+        self.tau = self.client.get_contract('tau')
+        self.eth = self.client.get_contract('eth')
+        self.btc = self.client.get_contract('btc')
+        self.dex = self.client.get_contract('dex')
+        self.dex_pairs = self.client.get_contract('dex_pairs')
+
+        self.dex.create_pair(dex_pairs='dex_pairs', tau_contract='tau', token_contract='eth')
+        self.dex.create_pair(dex_pairs='dex_pairs', tau_contract='tau', token_contract='btc')
+
+    def add_liquidity(self, token, tau_amount, token_amount):
+        self.tau.transfer(amount=tau_amount, to=self.dex_pairs.name)
+        token.transfer(amount=token_amount, to=self.dex_pairs.name)
+
+        self.dex_pairs.mint_liquidity(
+            dex_contract=self.dex.name,
+            tau_contract=self.tau.name,
+            token_contract=token.name,
+            to_address=self.wallet_address
+        )
+
+    def test_swap_exact_tokens_for_tokens(self):
+        self.add_liquidity(self.eth, 5, 10)
+
+        amounts = self.dex.swap_exact_tokens_for_tokens(
+            dex_pairs=self.dex_pairs.name,
+            amount_in=1,
+            amount_out_min=0,
+            path=['tau', 'eth'],
+            to='test_results_wallet'
+        )
+
+        expected_output_amount = self.expand_to_token_decimals(1662497915624478906)
+        self.assertAlmostEqual(amounts[-1], expected_output_amount, places=17)
+
+        self.assertEqual(self.tau.balance_of(account=self.wallet_address), STARTING_BALANCE - 5 - 1)
+        self.assertEqual(self.eth.balance_of(account='test_results_wallet'), amounts[-1])
+
+        tau_reserve, token_reserve = self.dex_pairs.get_pair_reserves(tau_contract='tau', token_contract='eth')
+        self.assertEqual(tau_reserve, 5 + 1)
+        self.assertEqual(token_reserve, 10 - amounts[-1])
+
+    def test_swap_exact_tokens_for_tokens_reverse_pair(self):
+        self.add_liquidity(self.eth, 10, 5)
+
+        amounts = self.dex.swap_exact_tokens_for_tokens(
+            dex_pairs=self.dex_pairs.name,
+            amount_in=1,
+            amount_out_min=0,
+            path=['eth', 'tau'],
+            to='test_results_wallet'
+        )
+
+        expected_output_amount = self.expand_to_token_decimals(1662497915624478906)
+        self.assertAlmostEqual(amounts[-1], expected_output_amount, places=17)
+        self.assertEqual(self.tau.balance_of(account='test_results_wallet'), amounts[-1])
+
+        tau_reserve, token_reserve = self.dex_pairs.get_pair_reserves(tau_contract='tau', token_contract='eth')
+        self.assertEqual(tau_reserve, 10 - amounts[-1])
+        self.assertEqual(token_reserve, 5 + 1)
+
+    def test_swap_exact_tokens_for_tokens_multi_hop(self):
+        self.add_liquidity(self.eth, 100, 200)
+        self.add_liquidity(self.btc, 100, 50)
+
+        path = ['eth', 'tau', 'btc']
+        expected_amounts = self.dex.get_amounts_out(dex_pairs=self.dex_pairs.name, amount_in=10, path=path)
+
+        amounts = self.dex.swap_exact_tokens_for_tokens(
+            dex_pairs=self.dex_pairs.name,
+            amount_in=10,
+            amount_out_min=expected_amounts[-1],
+            path=path,
+            to='test_results_wallet'
+        )
+        self.assertEqual(amounts, expected_amounts)
+
+        self.assertEqual(self.eth.balance_of(account=self.wallet_address), STARTING_BALANCE - 200 - 10)
+        self.assertEqual(self.btc.balance_of(account='test_results_wallet'), amounts[2])
+        self.assertEqual(self.tau.balance_of(account='test_results_wallet'), 0)
+        self.assertEqual(self.tau.balance_of(account=self.dex.name), 0)
+
+        tau_reserve, token_reserve = self.dex_pairs.get_pair_reserves(tau_contract='tau', token_contract='eth')
+        self.assertAlmostEqual(tau_reserve, 100 - amounts[1])
+        self.assertEqual(token_reserve, 200 + 10)
+
+        tau_reserve, token_reserve = self.dex_pairs.get_pair_reserves(tau_contract='tau', token_contract='btc')
+        self.assertAlmostEqual(tau_reserve, 100 + amounts[1])
+        self.assertAlmostEqual(token_reserve, 50 - amounts[2])
+
+    def test_swap_tokens_for_exact_tokens(self):
+        self.add_liquidity(self.eth, 5, 10)
+
+        amounts = self.dex.swap_tokens_for_exact_tokens(
+            dex_pairs=self.dex_pairs.name,
+            amount_out=1,
+            amount_in_max=1,
+            path=['tau', 'eth'],
+            to='test_results_wallet'
+        )
+
+        # UniswapV2 adds 1 wei to round up, this does not
+        expected_swap_amount = self.expand_to_token_decimals(557227237267357629)
+        self.assertAlmostEqual(amounts[0], expected_swap_amount, places=17)
+
+        self.assertEqual(self.tau.balance_of(account=self.wallet_address), STARTING_BALANCE - 5 - amounts[0])
+        self.assertEqual(self.eth.balance_of(account='test_results_wallet'), 1)
+
+    def test_swap_tokens_for_exact_tokens_multi_hop(self):
+        self.add_liquidity(self.eth, 100, 200)
+        self.add_liquidity(self.btc, 100, 50)
+
+        path = ['eth', 'tau', 'btc']
+        expected_amounts = self.dex.get_amounts_in(dex_pairs=self.dex_pairs.name, amount_out=2, path=path)
+
+        amounts = self.dex.swap_tokens_for_exact_tokens(
+            dex_pairs=self.dex_pairs.name,
+            amount_out=2,
+            amount_in_max=expected_amounts[0],
+            path=path,
+            to='test_results_wallet'
+        )
+        self.assertEqual(amounts, expected_amounts)
+
+        self.assertEqual(self.eth.balance_of(account=self.wallet_address), STARTING_BALANCE - 200 - amounts[0])
+        self.assertEqual(self.btc.balance_of(account='test_results_wallet'), 2)
+
+    def test_swap_fails_if_less_than_amount_out_min(self):
+        self.add_liquidity(self.eth, 5, 10)
+
+        with self.assertRaises(AssertionError):
+            self.dex.swap_exact_tokens_for_tokens(
+                dex_pairs=self.dex_pairs.name,
+                amount_in=1,
+                amount_out_min=2,
+                path=['tau', 'eth'],
+                to='test_results_wallet'
+            )
+
+        self.assertEqual(self.dex_pairs.get_pair_reserves(tau_contract='tau', token_contract='eth'), (5, 10))
+
+    def test_swap_fails_if_more_than_amount_in_max(self):
+        self.add_liquidity(self.eth, 5, 10)
+
+        with self.assertRaises(AssertionError):
+            self.dex.swap_tokens_for_exact_tokens(
+                dex_pairs=self.dex_pairs.name,
+                amount_out=1,
+                amount_in_max=0.5,
+                path=['tau', 'eth'],
+                to='test_results_wallet'
+            )
+
+    def test_swap_fails_if_invalid_path(self):
+        self.add_liquidity(self.eth, 5, 10)
+
+        with self.assertRaises(AssertionError):
+            self.dex.swap_exact_tokens_for_tokens(dex_pairs=self.dex_pairs.name, amount_in=1, amount_out_min=0, path=['tau'], to='test_results_wallet')
+
+        with self.assertRaises(AssertionError):
+            self.dex.swap_exact_tokens_for_tokens(dex_pairs=self.dex_pairs.name, amount_in=1, amount_out_min=0, path=['eth', 'btc'], to='test_results_wallet')